@@ -0,0 +1,75 @@
+"""
+Benchmark merge_data against the old chain of pairwise outer merges.
+
+Builds k synthetic datasets keyed by country name (each one covering a random
+~90% of the keys, in random order) and reports wall time and peak allocated
+memory (tracemalloc) for both approaches as k grows.
+
+Run from the repository root:
+    python -m benchmarks.bench_merge
+    python -m benchmarks.bench_merge --rows 50000 --datasets 2 4 8 16 32
+"""
+import argparse
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from src.data_preprocessing.preprocessing import merge_data
+
+
+def fold_merge(data_dict: dict[str, pd.DataFrame], key: str = "Country") -> pd.DataFrame:
+    """
+    The previous merge_data implementation: k-1 chained outer merges.
+    """
+    merged_df = None
+    for df in data_dict.values():
+        if merged_df is None:
+            merged_df = df
+        else:
+            merged_df = pd.merge(merged_df, df, on=key, how="outer")
+    return merged_df
+
+
+def make_datasets(n_datasets: int, n_rows: int, n_cols: int, seed: int = 0) -> dict[str, pd.DataFrame]:
+    rng = np.random.default_rng(seed)
+    keys = np.array([f"COUNTRY {i:07d}" for i in range(n_rows)], dtype=object)
+    data = {}
+    for d in range(n_datasets):
+        take = rng.permutation(n_rows)[: int(n_rows * 0.9)]
+        frame = pd.DataFrame(rng.normal(size=(len(take), n_cols)), columns=[f"d{d}_c{c}" for c in range(n_cols)])
+        frame.insert(0, "Country", keys[take])
+        data[f"dataset_{d}"] = frame
+    return data
+
+
+def measure(fn, *args) -> tuple[float, float]:
+    """
+    @return: Tuple of (seconds, peak MiB allocated during the call).
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--cols", type=int, default=10, help="columns per dataset")
+    parser.add_argument("--datasets", type=int, nargs="+", default=[2, 4, 7, 12, 20])
+    args = parser.parse_args()
+
+    print(f"rows={args.rows} cols/dataset={args.cols}")
+    print(f"{'k':>4} {'fold s':>9} {'concat s':>9} {'fold MiB':>9} {'concat MiB':>11}")
+    for k in args.datasets:
+        data = make_datasets(k, args.rows, args.cols)
+        fold_t, fold_mem = measure(fold_merge, data)
+        new_t, new_mem = measure(merge_data, data)
+        print(f"{k:>4} {fold_t:>9.3f} {new_t:>9.3f} {fold_mem:>9.1f} {new_mem:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Response size of the figure callbacks that send Patches, against full figures.
+
+For every metric (and top/bottom mode for the leaderboard) the callback is
+called through the app's test client, and the response body is compared with
+the same response carrying the complete figure.
+
+Run from the repository root:
+    python -m benchmarks.bench_payload
+"""
+import sys
+import dash
+from plotly.io.json import to_json_plotly
+from src.app import app
+
+
+def _page_module(path: str):
+    page = next(p for p in dash.page_registry.values() if p["path"] == path)
+    return sys.modules[page["module"]]
+
+
+def _call(client, output_id: str, inputs: list[dict]) -> int:
+    body = {
+        "output": f"{output_id}.figure",
+        "outputs": {"id": output_id, "property": "figure"},
+        "inputs": inputs,
+        "changedPropIds": [f"{i['id']}.{i['property']}" for i in inputs],
+        "state": [],
+    }
+    response = client.post("/_dash-update-component", json=body)
+    if response.status_code != 200:
+        raise RuntimeError(f"{output_id}: callback failed with {response.status_code}")
+    return len(response.data)
+
+
+def _full_size(output_id: str, figure) -> int:
+    return len(to_json_plotly({"multi": True, "response": {output_id: {"figure": figure}}}).encode())
+
+
+def main():
+    client = app.server.test_client()
+    home = _page_module("/")
+    global_page = _page_module("/global")
+
+    rows = []
+
+    if getattr(home, "CLIENTSIDE_METRIC_SWITCH", False):
+        print("home map uses the clientside switch, skipping update_graph")
+    else:
+        version = home.get_dataset_version()
+        for metric in [None, *home.VIEW_METRICS]:
+            if metric is not None and metric not in home.df.columns:
+                continue
+            patch = _call(client, "graph", [
+                {"id": "views-radioitems", "property": "value", "value": metric},
+                {"id": "filters-store", "property": "data", "value": {}},
+            ])
+            full_fig = home.fig_map_json if metric is None else home.metric_figure(metric, version)
+            rows.append(("update_graph", str(metric), _full_size("graph", full_fig), patch))
+
+    for metric in global_page.LEADERBOARD_METRICS:
+        for bottom in (False, True):
+            inputs = [
+                {"id": "leaderboard-metric", "property": "value", "value": metric},
+                {"id": "ranking-top-n", "property": "value", "value": 50},
+                {"id": "show-bottom", "property": "value", "value": ["bottom"] if bottom else []},
+                {"id": "filters-store", "property": "data", "value": {}},
+            ]
+            patch = _call(client, "global-ranking", inputs)
+            full_fig = global_page.build_global_ranking(metric, 50, bottom)
+            rows.append(("update_global_ranking", f"{metric}{' (bottom)' if bottom else ''}", _full_size("global-ranking", full_fig), patch))
+
+    print(f"{'callback':<22} {'input':<48} {'full B':>8} {'patch B':>8} {'saved':>6}")
+    totals = {}
+    for name, label, full, patch in rows:
+        print(f"{name:<22} {label[:48]:<48} {full:>8,} {patch:>8,} {1 - patch / full:>6.0%}")
+        total = totals.setdefault(name, [0, 0])
+        total[0] += full
+        total[1] += patch
+
+    print()
+    for name, (full, patch) in totals.items():
+        print(f"{name:<22} total {full:,} -> {patch:,} bytes ({1 - patch / full:.0%} saved)")
+
+
+if __name__ == "__main__":
+    main()
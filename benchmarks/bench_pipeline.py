@@ -0,0 +1,241 @@
+"""
+Benchmark suite for the data pipeline and the figure builders.
+
+Pipeline: every stage of load_data_into_df (csv reads per file, each
+clean_*_data, both merges, clean_country_names, derive_new_metrics and the
+dtype plan, as recorded by utils.instrumentation) is timed on the
+shipped csvs (scale 1) and on synthetic copies at larger scales (see
+benchmarks/synthetic.py). Each stage reports the best wall and CPU time over
+--repeat runs, the peak memory allocated inside the stage (tracemalloc, in a
+separate traced run) and the shape of its output.
+The copies' names are registered with the name resolution (synthetic.copy_names),
+so they stay separate countries and every later stage sees scale x the rows.
+
+Figures: build_scatter, build_global_ranking, build_correlation_heatmap and
+update_graph run on the canonical dataset, replicated --figure-scales times.
+Every scale runs in a fresh process (the pages keep the dataset at import);
+"import" includes what the pages precompute, "first" is the first call after
+it and "best" the best repeat (served from the figure caches where there are any).
+
+Results are written as JSON (default benchmarks/results/pipeline-<utc time>.json)
+and can be compared with an earlier run.
+
+Run from the repository root:
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --scales 1 10 100 1000 --figure-scales 1 10
+    python -m benchmarks.bench_pipeline --compare benchmarks/results/pipeline-<old>.json
+"""
+import argparse
+import concurrent.futures
+import contextlib
+import datetime
+import json
+import multiprocessing
+import pathlib
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+import numpy as np
+import pandas as pd
+from benchmarks.synthetic import copy_names, replicate_dataset, write_synthetic_csvs
+from src.utils.instrumentation import finish_report, new_report
+from src.data_loading.load_data import load_data_into_df
+from src.data_preprocessing.preprocessing import DATA_DIR, EXTERNAL_DATA_DIR
+
+RESULTS_DIR = pathlib.Path(__file__).parent / "results"
+
+
+@contextlib.contextmanager
+def warnings_silenced():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        yield
+
+
+#region pipeline
+def _timed_runs(data_dir, external_dir, repeat: int) -> tuple[dict, float]:
+    best, total = {}, np.inf
+    for _ in range(repeat):
+        report = new_report(trace_memory=False)
+        load_data_into_df(data_dir, external_dir, report)
+        report = finish_report(report)
+        total = min(total, report["total_wall_s"])
+        for stage in report["stages"]:
+            entry = best.setdefault(stage["stage"], dict(stage))
+            entry["wall_s"] = min(entry["wall_s"], stage["wall_s"])
+            entry["cpu_s"] = min(entry["cpu_s"], stage["cpu_s"])
+    return best, total
+
+
+def _traced_run(data_dir, external_dir) -> dict:
+    report = new_report(trace_memory=True)
+    load_data_into_df(data_dir, external_dir, report)
+    return {stage["stage"]: stage["peak_mib"] for stage in finish_report(report)["stages"]}
+
+
+def bench_pipeline(scale: int, repeat: int) -> dict:
+    """
+    Time and memory per pipeline stage at one scale (1 = the shipped csvs).
+    """
+    with tempfile.TemporaryDirectory(prefix=f"synthetic-{scale}x-") as tmp:
+        if scale == 1:
+            data_dir, external_dir = DATA_DIR, EXTERNAL_DATA_DIR
+        else:
+            data_dir, external_dir = write_synthetic_csvs(scale, pathlib.Path(tmp))
+        input_rows = sum(len(pd.read_csv(p, usecols=[0])) for d in (data_dir, external_dir) for p in d.glob("*.csv"))
+
+        # the cleaners warn about unparsable cells
+        with warnings_silenced(), copy_names(scale):
+            stages, total = _timed_runs(data_dir, external_dir, repeat)
+            peaks = _traced_run(data_dir, external_dir)
+
+    for name, entry in stages.items():
+        entry["peak_mib"] = peaks[name]
+    return {"scale": scale, "input_rows": input_rows, "load_data_into_df_s": total, "stages": list(stages.values())}
+#endregion
+
+
+#region figures
+def _measure_call(fn, repeat: int) -> dict:
+    start = time.perf_counter()
+    fn()
+    first = time.perf_counter() - start
+
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"first_s": first, "best_s": best, "peak_mib": peak / 2**20}
+
+
+def bench_figures(scale: int, repeat: int) -> dict:
+    """
+    Figure builder timings on the dataset replicated `scale` times.
+    Meant to run in a fresh process, see main().
+    """
+    import dash
+    from src.data_loading import store
+
+    with warnings_silenced():
+        df = store.get_dataset()
+        if scale > 1:
+            store.use_dataset(replicate_dataset(df, scale), f"{store.get_dataset_version()}-x{scale}")
+        df = store.get_dataset()
+
+        start = time.perf_counter()
+        from src.app import app  # noqa: F401  (registers the pages)
+        import_s = time.perf_counter() - start
+
+    pages = {p["path"]: sys.modules[p["module"]] for p in dash.page_registry.values()}
+    home, global_page = pages["/"], pages["/global"]
+
+    builders = {
+        "build_scatter": lambda: global_page.build_scatter(global_page.DEFAULT_X, global_page.DEFAULT_Y, True, True, 10),
+        "build_global_ranking": lambda: global_page.build_global_ranking(global_page.DEFAULT_LEADERBOARD_METRIC, 50),
+        "build_global_ranking (no index)": lambda: global_page.build_global_ranking("Median_Age", 50),
+        "build_correlation_heatmap": lambda: global_page.build_correlation_heatmap(global_page.CORR_COLS, "spearman", True),
+        "update_graph": lambda: home.update_graph("Real_GDP_per_Capita_USD", {}),
+    }
+    results = [{"builder": name, **_measure_call(fn, repeat)} for name, fn in builders.items()]
+    return {"scale": scale, "rows": len(df), "import_s": import_s, "builders": results}
+#endregion
+
+
+def _in_fresh_process(fn, *args):
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def _metadata(args) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "time": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": multiprocessing.cpu_count(),
+        "repeat": args.repeat,
+    }
+
+
+def _flatten(results: dict) -> dict:
+    # (section, scale, name) -> seconds, for comparing runs
+    out = {}
+    for run in results.get("pipeline", []):
+        for stage in run["stages"]:
+            out[("pipeline", run["scale"], stage["stage"])] = stage["wall_s"]
+        out[("pipeline", run["scale"], "load_data_into_df")] = run["load_data_into_df_s"]
+    for run in results.get("figures", []):
+        out[("figures", run["scale"], "import")] = run["import_s"]
+        for builder in run["builders"]:
+            out[("figures", run["scale"], builder["builder"])] = builder["best_s"]
+    return out
+
+
+def compare(old: dict, new: dict):
+    before, after = _flatten(old), _flatten(new)
+    print(f"\ncompared with {old['meta'].get('time')} ({(old['meta'].get('commit') or '')[:10]})")
+    print(f"{'section':<9} {'x':>5} {'name':<40} {'old s':>9} {'new s':>9} {'ratio':>6}")
+    for key in sorted(set(before) & set(after), key=str):
+        section, scale, name = key
+        print(f"{section:<9} {scale:>5} {name[:40]:<40} {before[key]:>9.4f} {after[key]:>9.4f} {after[key] / before[key]:>6.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="*", default=[1, 10, 100], help="pipeline row multipliers")
+    parser.add_argument("--figure-scales", type=int, nargs="*", default=[1, 10], help="dataset multipliers for the figure builders")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=pathlib.Path, default=None)
+    parser.add_argument("--compare", type=pathlib.Path, default=None, help="earlier results file")
+    args = parser.parse_args()
+
+    results = {"meta": _metadata(args), "pipeline": [], "figures": []}
+
+    for scale in args.scales:
+        run = _in_fresh_process(bench_pipeline, scale, args.repeat)
+        results["pipeline"].append(run)
+        print(f"\npipeline x{scale}: {run['input_rows']:,} input rows, load_data_into_df {run['load_data_into_df_s']:.3f} s")
+        print(f"{'stage':<44} {'wall s':>9} {'cpu s':>9} {'peak MiB':>9} {'shape':>12}")
+        for stage in sorted(run["stages"], key=lambda s: -s["wall_s"]):
+            shape = "x".join(str(n) for n in (stage["rows"], stage["cols"]) if n is not None)
+            print(f"{stage['stage'][:44]:<44} {stage['wall_s']:>9.4f} {stage['cpu_s']:>9.4f} {stage['peak_mib']:>9.1f} {shape:>12}")
+
+    for scale in args.figure_scales:
+        run = _in_fresh_process(bench_figures, scale, args.repeat)
+        results["figures"].append(run)
+        print(f"\nfigures x{scale}: {run['rows']:,} rows, import {run['import_s']:.3f} s")
+        print(f"{'builder':<40} {'first s':>9} {'best s':>9} {'peak MiB':>9}")
+        for builder in run["builders"]:
+            print(f"{builder['builder']:<40} {builder['first_s']:>9.4f} {builder['best_s']:>9.4f} {builder['peak_mib']:>9.1f}")
+
+    output = args.output
+    if output is None:
+        stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = RESULTS_DIR / f"pipeline-{stamp}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"\nresults written to {output}")
+
+    if args.compare is not None:
+        compare(json.loads(args.compare.read_text()), results)
+
+
+if __name__ == "__main__":
+    main()
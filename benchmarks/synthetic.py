@@ -0,0 +1,132 @@
+"""
+Synthetic inputs at a multiple of the shipped row count, for the benchmarks.
+
+write_synthetic_csvs copies every csv in data/ and external_data/ `scale`
+times into a new directory tree. Copy k > 0 gets unique keys ("FRANCE 3",
+"FRA3") and every other column independently shuffled, so the files keep the
+exact columns, cell formats ("$1,234 (2023 est.)", coordinates, ...) and null
+rates of the originals.
+
+copy_names registers the copies' names with the country name resolution
+(alias map and exact ISO3 lookup) for as long as the pipeline runs on them, so
+"FRANCE 3" resolves to "France 3" / "FRA3" like FRANCE does to France / FRA and
+the copies stay separate rows through clean_country_names and everything after.
+
+replicate_dataset does the same for the final merged dataset, for code that
+runs after the pipeline (figure builders, analytics).
+
+Run from the repository root to write files for inspection:
+    python -m benchmarks.synthetic --scale 10 --out /tmp/synthetic-10x
+"""
+import argparse
+import contextlib
+import pathlib
+import numpy as np
+import pandas as pd
+from src.data_preprocessing import preprocessing
+from src.data_preprocessing.mappings import get_country_map
+from src.data_preprocessing.preprocessing import DATA_DIR, EXTERNAL_DATA_DIR, MERGED_TERRITORIES, resolve_ISO3
+
+# key column of every input directory
+KEY_COLUMNS = {"data": "Country", "external_data": "ISO3"}
+
+
+def _scale_frame(frame: pd.DataFrame, key: str, scale: int, separator: str, rng: np.random.Generator) -> pd.DataFrame:
+    copies = [frame]
+    for k in range(1, scale):
+        copy = pd.DataFrame(
+            {c: frame[c].to_numpy()[rng.permutation(len(frame))] for c in frame.columns if c != key},
+            columns=frame.columns,
+        )
+        copy[key] = frame[key].where(frame[key] == "", frame[key] + f"{separator}{k}").to_numpy()
+        copies.append(copy[frame.columns])
+    return pd.concat(copies, ignore_index=True)
+
+
+def write_synthetic_csvs(scale: int, out_dir: pathlib.Path, seed: int = 0) -> tuple[pathlib.Path, pathlib.Path]:
+    """
+    Write every shipped csv scaled to `scale` times its rows.
+
+    @param scale: Row multiplier (1 copies the files as they are).
+    @param out_dir: Directory to create data/ and external_data/ in.
+    @param seed: Seed for the column shuffles.
+    @return: Tuple of (data dir, external data dir) to pass to load_data_into_df.
+    """
+    rng = np.random.default_rng(seed)
+    out_dir = pathlib.Path(out_dir)
+    dirs = {}
+    for name, source in (("data", DATA_DIR), ("external_data", EXTERNAL_DATA_DIR)):
+        target = out_dir / name
+        target.mkdir(parents=True, exist_ok=True)
+        # CIA names get a space before the copy number, ISO3 codes don't
+        separator = " " if name == "data" else ""
+        for path in sorted(source.glob("*.csv")):
+            # read as text so every cell is written back exactly as it was
+            frame = pd.read_csv(path, dtype=str, keep_default_na=False)
+            _scale_frame(frame, KEY_COLUMNS[name], scale, separator, rng).to_csv(target / path.name, index=False)
+        dirs[name] = target
+    return dirs["data"], dirs["external_data"]
+
+
+@contextlib.contextmanager
+def copy_names(scale: int):
+    """
+    Make the names of copies 1..scale-1 written by write_synthetic_csvs resolve
+    like the originals: "<CIA name> k" -> "<country> k" in the alias map and
+    "<country> k" -> "<ISO3>k" in the exact ISO3 lookup. Removed again on exit.
+    """
+    country_map = get_country_map()
+    countries = {MERGED_TERRITORIES.get(v, v) for v in country_map.values() if v is not None}
+    codes, _ = resolve_ISO3(pd.Series(sorted(countries), dtype=object))
+    resolved = {name: code for name, code in zip(sorted(countries), codes) if code is not None}
+
+    aliases, iso3 = {}, {}
+    for k in range(1, scale):
+        for name, country in country_map.items():
+            aliases[f"{name} {k}"] = None if country is None else f"{MERGED_TERRITORIES.get(country, country)} {k}"
+        for country, code in resolved.items():
+            iso3[f"{country} {k}"] = f"{code}{k}"
+
+    country_map.update(aliases)
+    preprocessing.iso3_by_name.update(iso3)
+    try:
+        yield
+    finally:
+        for name in aliases:
+            country_map.pop(name, None)
+        for name in iso3:
+            preprocessing.iso3_by_name.pop(name, None)
+
+
+def replicate_dataset(df: pd.DataFrame, scale: int, seed: int = 0) -> pd.DataFrame:
+    """
+    The merged dataset repeated `scale` times, copies with unique Country/ISO3
+    and shuffled columns (dtypes, categoricals and null rates are kept).
+    """
+    rng = np.random.default_rng(seed)
+    copies = [df]
+    for k in range(1, scale):
+        copy = pd.DataFrame({c: df[c].to_numpy()[rng.permutation(len(df))] for c in df.columns}, columns=df.columns)
+        copy["Country"] = df["Country"].astype(str).to_numpy() + f" {k}"
+        copy["ISO3"] = df["ISO3"].where(df["ISO3"].isna(), df["ISO3"].astype(str) + str(k)).to_numpy()
+        copies.append(copy)
+    out = pd.concat(copies, ignore_index=True)
+    # the shuffled copies come back as plain numpy columns, restore the dtypes
+    return out.astype(df.dtypes.to_dict())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=10)
+    parser.add_argument("--out", type=pathlib.Path, required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    data_dir, external_dir = write_synthetic_csvs(args.scale, args.out, args.seed)
+    for directory in (data_dir, external_dir):
+        for path in sorted(directory.glob("*.csv")):
+            print(f"{path}  {path.stat().st_size / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
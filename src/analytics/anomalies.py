@@ -0,0 +1,194 @@
+import functools
+import warnings
+import numpy as np
+import pandas as pd
+from src.data_loading.store import get_dataset, get_dataset_version
+
+# Over/under-performers across every (economic, social) column pair at once.
+# Same model as the scatter on the global page (y ~ a + b*x or log x, residual
+# sign flipped for lower-is-better y columns) but all pairs are fitted together:
+# the moment sums for every pair come out of a handful of matrix products over
+# NaN-masked column blocks, and the residuals form one country x pair matrix.
+
+
+def _pair_moments(x: np.ndarray, y: np.ndarray) -> dict:
+    """
+    Pairwise-complete moment sums between every column of x and every column of y.
+
+    @param x: (rows, p) float array, NaN for missing.
+    @param y: (rows, q) float array, NaN for missing.
+    @return: Dictionary of (p, q) arrays n, sx, sy, sxx, sxy.
+    """
+    wx, wy = ~np.isnan(x), ~np.isnan(y)
+    x0, y0 = np.where(wx, x, 0.0), np.where(wy, y, 0.0)
+    wx, wy = wx.astype(np.float64), wy.astype(np.float64)
+    return {
+        "n": wx.T @ wy,
+        "sx": x0.T @ wy,
+        "sy": wx.T @ y0,
+        "sxx": (x0 * x0).T @ wy,
+        "sxy": x0.T @ y0,
+    }
+
+
+def _fit_block(x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Fit every (x column, y column) pair.
+
+    @return: Tuple of (slope (p, q), intercept (p, q), residuals (rows, p, q)).
+        Residuals are NaN wherever x or y is missing.
+    """
+    # centre the columns first, keeps the moment sums well conditioned
+    # for columns like GDP in USD
+    with warnings.catch_warnings():
+        # all-NaN columns just give NaN means (and no fit)
+        warnings.simplefilter("ignore", RuntimeWarning)
+        x_mean = np.nanmean(x, axis=0)
+        y_mean = np.nanmean(y, axis=0)
+    xc, yc = x - x_mean, y - y_mean
+
+    m = _pair_moments(xc, yc)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mx, my = m["sx"] / m["n"], m["sy"] / m["n"]
+        sxx = m["sxx"] - m["n"] * mx * mx
+        sxy = m["sxy"] - m["n"] * mx * my
+        slope = np.where(sxx > 0, sxy / sxx, 0.0)
+    slope = np.where(m["n"] > 0, slope, np.nan)
+    intercept_c = my - slope * mx
+
+    residual = yc[:, None, :] - (intercept_c[None] + slope[None] * xc[:, :, None])
+    # back to the original units: y = y_mean + a_c + b * (x - x_mean)
+    intercept = y_mean[None, :] + intercept_c - slope * x_mean[:, None]
+    return slope, intercept, residual
+
+
+def build_residual_tensor(
+    df: pd.DataFrame,
+    x_cols: list[str],
+    y_cols: list[str],
+    lower_is_better=(),
+) -> dict:
+    """
+    Fit every x_col / y_col pair, with and without log(x), in one batch.
+
+    Residuals are y - predicted, negated for y columns in lower_is_better so
+    positive always means "better than expected". Standardized residuals
+    divide by the residual standard error of the pair (n - 2 degrees of freedom).
+
+    @param df: Dataset with the columns.
+    @param x_cols: Predictor columns (economic indicators).
+    @param y_cols: Explained columns (social indicators).
+    @param lower_is_better: y columns where a lower value is better.
+    @return: Dictionary with
+        pairs     - DataFrame (x_col, y_col, log_x, n, slope, intercept, resid_std), one row per pair
+        residual  - (countries, pairs) float array, NaN where the country was not in the fit
+        zscore    - same shape, standardized residuals
+        countries - DataFrame (Country, ISO3) aligned with the rows
+    """
+    x = df[x_cols].to_numpy(dtype="float64", na_value=np.nan)
+    y = df[y_cols].to_numpy(dtype="float64", na_value=np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        log_x = np.where(x > 0, np.log(x), np.nan)
+
+    sign = np.array([-1.0 if c in lower_is_better else 1.0 for c in y_cols])
+
+    pair_frames, residual_blocks = [], []
+    for use_log, xs in ((False, x), (True, log_x)):
+        slope, intercept, resid = _fit_block(xs, y)
+        resid = resid * sign
+        n = (~np.isnan(resid)).sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            resid_std = np.sqrt(np.nansum(resid * resid, axis=0) / (n - 2))
+        resid_std = np.where(n > 2, resid_std, np.nan)
+
+        xi, yi = np.meshgrid(np.arange(len(x_cols)), np.arange(len(y_cols)), indexing="ij")
+        pair_frames.append(pd.DataFrame({
+            "x_col": np.asarray(x_cols, dtype=object)[xi.ravel()],
+            "y_col": np.asarray(y_cols, dtype=object)[yi.ravel()],
+            "log_x": use_log,
+            "n": n.ravel(),
+            "slope": slope.ravel(),
+            "intercept": intercept.ravel(),
+            "resid_std": resid_std.ravel(),
+        }))
+        residual_blocks.append(resid.reshape(len(df), -1))
+
+    pairs = pd.concat(pair_frames, ignore_index=True)
+    residual = np.concatenate(residual_blocks, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        zscore = residual / pairs["resid_std"].to_numpy()
+
+    return {
+        "pairs": pairs,
+        "residual": residual,
+        "zscore": zscore,
+        "countries": df[["Country", "ISO3"]].reset_index(drop=True),
+    }
+
+
+@functools.lru_cache(maxsize=4)
+def _cached_tensor(x_cols: tuple, y_cols: tuple, lower_is_better: frozenset, dataset_version: str) -> dict:
+    tensor = build_residual_tensor(get_dataset(), list(x_cols), list(y_cols), lower_is_better)
+    tensor["residual"].flags.writeable = False
+    tensor["zscore"].flags.writeable = False
+    return tensor
+
+
+def get_residual_tensor(x_cols: list[str], y_cols: list[str], lower_is_better=()) -> dict:
+    """
+    build_residual_tensor on the canonical dataset, computed once per dataset version.
+    """
+    return _cached_tensor(tuple(x_cols), tuple(y_cols), frozenset(lower_is_better), get_dataset_version())
+
+
+def _top_abs(values: np.ndarray, k: int) -> np.ndarray:
+    # positions of the k largest |values| (NaN last), largest first
+    score = np.abs(values)
+    score = np.where(np.isnan(score), -np.inf, score)
+    k = min(k, int(np.isfinite(score).sum()))
+    if k <= 0:
+        return np.array([], dtype=int)
+    top = np.argpartition(-score, k - 1)[:k]
+    return top[np.argsort(-score[top], kind="stable")]
+
+
+def pair_anomalies(tensor: dict, x_col: str, y_col: str, log_x: bool, k: int = 10) -> pd.DataFrame:
+    """
+    The k most anomalous countries for one pair.
+
+    @return: DataFrame with Country, ISO3, residual and zscore, ordered by |zscore|.
+    """
+    pairs = tensor["pairs"]
+    match = np.flatnonzero(
+        (pairs["x_col"] == x_col).to_numpy()
+        & (pairs["y_col"] == y_col).to_numpy()
+        & (pairs["log_x"] == bool(log_x)).to_numpy()
+    )
+    if len(match) == 0:
+        raise KeyError(f"pair not in tensor: {x_col!r} / {y_col!r} (log_x={log_x})")
+    col = match[0]
+
+    rows = _top_abs(tensor["zscore"][:, col], k)
+    out = tensor["countries"].iloc[rows].reset_index(drop=True)
+    out["residual"] = tensor["residual"][rows, col]
+    out["zscore"] = tensor["zscore"][rows, col]
+    return out
+
+
+def country_anomalies(tensor: dict, iso3: str, k: int = 10) -> pd.DataFrame:
+    """
+    The k pairs in which a country deviates most from the fitted line.
+
+    @return: DataFrame with x_col, y_col, log_x, residual and zscore, ordered by
+        |zscore|. Empty if the ISO3 code is unknown.
+    """
+    match = np.flatnonzero((tensor["countries"]["ISO3"] == iso3).to_numpy())
+    if len(match) == 0:
+        return pd.DataFrame(columns=["x_col", "y_col", "log_x", "residual", "zscore"])
+    row = match[0]
+
+    cols = _top_abs(tensor["zscore"][row], k)
+    out = tensor["pairs"].iloc[cols][["x_col", "y_col", "log_x"]].reset_index(drop=True)
+    out["residual"] = tensor["residual"][row, cols]
+    out["zscore"] = tensor["zscore"][row, cols]
+    return out
@@ -0,0 +1,234 @@
+import functools
+import warnings
+import numpy as np
+import pandas as pd
+from scipy.cluster.hierarchy import leaves_list, linkage
+from scipy.spatial.distance import squareform
+from src.data_loading.store import get_dataset_version, get_derived
+
+# Pairwise-complete correlation matrices over every numeric column.
+# Each pair uses all rows where both columns are present (no listwise deletion),
+# and the whole matrix comes out of masked moment sums in one go. Subsets of
+# columns for the heatmap are slices of the precomputed matrices.
+# Spearman re-ranks every column under the mask of every other column; those
+# ranks are built for a block of mask columns at a time, so memory stays at
+# about SPEARMAN_BLOCK_BYTES per array instead of rows x cols x cols.
+
+# relative size below which a variance counts as zero (constant column)
+CONSTANT_RTOL = 1e-12
+# pairs whose variance is this small relative to the raw sums are recomputed exactly
+REFIT_RTOL = 1e-6
+# size of one rows x cols x block array of the blocked Spearman computation
+# (a block allocates about ten of them)
+SPEARMAN_BLOCK_BYTES = 16 << 20
+
+
+def numeric_columns(df: pd.DataFrame) -> list[str]:
+    return [
+        c for c in df.columns
+        if pd.api.types.is_numeric_dtype(df[c]) and not pd.api.types.is_bool_dtype(df[c])
+    ]
+
+
+def _masked_pearson(a: np.ndarray, b: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """
+    Pearson correlation of a[:, i, j] and b[:, i, j] over rows where mask[:, i, j],
+    for every (i, j) at once. Values outside the mask are ignored.
+    """
+    w = mask.astype(np.float64)
+    a = np.where(mask, a, 0.0)
+    b = np.where(mask, b, 0.0)
+    n = w.sum(axis=0)
+    sa, sb = a.sum(axis=0), b.sum(axis=0)
+    saa, sbb = (a * a).sum(axis=0), (b * b).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = (a * b).sum(axis=0) - sa * sb / n
+        var_a = saa - sa * sa / n
+        var_b = sbb - sb * sb / n
+        corr = cov / np.sqrt(var_a * var_b)
+    corr[_is_constant(var_a, saa) | _is_constant(var_b, sbb)] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+def _is_constant(var: np.ndarray, sum_sq: np.ndarray) -> np.ndarray:
+    # variance that is only rounding noise of the sums -> constant column on that subset
+    return ~(var > CONSTANT_RTOL * sum_sq)
+
+
+def pairwise_pearson(x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Pairwise-complete Pearson correlation between the columns of x.
+
+    @param x: (rows, cols) float array, NaN for missing.
+    @return: Tuple of (correlation matrix, matrix of rows used per pair).
+    """
+    valid = ~np.isnan(x)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        # centre first so the sums stay well conditioned
+        x = x - np.nanmean(x, axis=0)
+    x0 = np.where(valid, x, 0.0)
+    w = valid.astype(np.float64)
+
+    n = w.T @ w
+    sx = x0.T @ w          # sum of column i over rows where j is present
+    sxx = (x0 * x0).T @ w
+    sxy = x0.T @ x0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = sxy - sx * sx.T / n
+        var_x = sxx - sx * sx / n
+        corr = cov / np.sqrt(var_x * var_x.T)
+    corr = np.clip(corr, -1.0, 1.0)
+
+    # the one-pass sums cancel badly when a pair covers a few rows far from the
+    # column mean (outliers elsewhere in the column), redo those pairs two-pass
+    suspect = ~(var_x > REFIT_RTOL * sxx)
+    for i, j in zip(*np.nonzero(np.triu(suspect | suspect.T))):
+        corr[i, j] = corr[j, i] = _two_pass_pearson(x[:, i], x[:, j])
+    return corr, n.astype(np.int64)
+
+
+def _two_pass_pearson(a: np.ndarray, b: np.ndarray) -> float:
+    both = ~np.isnan(a) & ~np.isnan(b)
+    a, b = a[both], b[both]
+    if len(a) < 2:
+        return np.nan
+    a, b = a - a.mean(), b - b.mean()
+    denom = np.sqrt(np.dot(a, a) * np.dot(b, b))
+    if not denom > 0:
+        return np.nan
+    return float(np.clip(np.dot(a, b) / denom, -1.0, 1.0))
+
+
+def _masked_ranks(x: np.ndarray, valid: np.ndarray, columns: np.ndarray, masks: np.ndarray) -> np.ndarray:
+    """
+    ranks[r, a, b] = average rank of x[r, columns[a]] among the rows where both
+    column columns[a] and column masks[b] are present (NaN elsewhere).
+
+    One sort per column, the ranks for every mask come from a cumulative count
+    of that mask along the sort order.
+    """
+    rows = x.shape[0]
+    n_cols = len(columns)
+    xs, vs = x[:, columns], valid[:, columns]
+    order = np.argsort(np.where(vs, xs, np.inf), axis=0, kind="stable")
+    x_sorted = np.take_along_axis(xs, order, axis=0)
+
+    # valid rows of every mask column, in the sort order of each ranked column: (rows, a, b)
+    pair_valid = valid[:, masks][order] & np.take_along_axis(vs, order, axis=0)[:, :, None]
+    counts = np.cumsum(pair_valid, axis=0)
+
+    # tie groups in the sorted values of each column
+    pos = np.arange(rows)[:, None]
+    new_group = np.ones((rows, n_cols), dtype=bool)
+    new_group[1:] = x_sorted[1:] != x_sorted[:-1]
+    group_start = np.maximum.accumulate(np.where(new_group, pos, 0), axis=0)
+    last_of_group = np.ones((rows, n_cols), dtype=bool)
+    last_of_group[:-1] = new_group[1:]
+    group_end = np.minimum.accumulate(np.where(last_of_group, pos, rows - 1)[::-1], axis=0)[::-1]
+
+    before = np.where(
+        (group_start > 0)[:, :, None],
+        np.take_along_axis(counts, np.maximum(group_start - 1, 0)[:, :, None], axis=0),
+        0,
+    )
+    through = np.take_along_axis(counts, group_end[:, :, None], axis=0)
+    ranks_sorted = np.where(pair_valid, (before + 1 + through) / 2.0, np.nan)
+
+    ranks = np.empty_like(ranks_sorted)
+    ranks[order, np.arange(n_cols)[None, :], :] = ranks_sorted
+    return ranks
+
+
+def pairwise_spearman(x: np.ndarray, block_bytes: int = SPEARMAN_BLOCK_BYTES) -> np.ndarray:
+    """
+    Pairwise-complete Spearman correlation between the columns of x: every pair
+    is ranked over the rows where both columns are present (ties get the
+    average rank), same as pandas' corr(method="spearman").
+
+    @param x: (rows, cols) float array, NaN for missing.
+    @param block_bytes: Size of one rows x cols x block working array, the
+        matrix is computed a block of columns at a time.
+    @return: (cols, cols) correlation matrix.
+    """
+    rows, cols = x.shape
+    valid = ~np.isnan(x)
+    block = max(1, block_bytes // max(rows * cols * 8, 1))
+    everything = np.arange(cols)
+
+    corr = np.empty((cols, cols))
+    for start in range(0, cols, block):
+        js = everything[start:start + block]
+        # column i ranked where j is present, and column j ranked where i is present
+        ranks_i = _masked_ranks(x, valid, everything, js)
+        ranks_j = _masked_ranks(x, valid, js, everything).transpose(0, 2, 1)
+        mask = valid[:, :, None] & valid[:, None, js]
+        corr[:, js] = _masked_pearson(ranks_i, ranks_j, mask)
+    return corr
+
+
+def build_correlation(df: pd.DataFrame) -> dict:
+    """
+    Pearson and Spearman matrices over every numeric column of df.
+
+    @param df: Dataset.
+    @return: Dictionary with columns (list), pearson, spearman and n as
+        DataFrames indexed by column on both axes; n is the number of rows
+        each pair is computed from.
+    """
+    columns = numeric_columns(df)
+    x = df[columns].to_numpy(dtype="float64", na_value=np.nan)
+
+    pearson, n = pairwise_pearson(x)
+    spearman = pairwise_spearman(x)
+
+    def frame(values):
+        return pd.DataFrame(values, index=columns, columns=columns)
+
+    return {
+        "columns": columns,
+        "pearson": frame(pearson),
+        "spearman": frame(spearman),
+        "n": frame(n),
+    }
+
+
+def get_correlation() -> dict:
+    """
+    Shared build_correlation of the canonical dataset, built on first use.
+    """
+    return get_derived("correlation", build_correlation)
+
+
+def correlation_subset(cols: list[str], method: str = "pearson") -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Slice the precomputed matrices to cols.
+
+    @param cols: Numeric columns of the dataset.
+    @param method: "pearson" or "spearman".
+    @return: Tuple of (correlation matrix, pair counts), both indexed by cols.
+    """
+    corr = get_correlation()
+    return corr[method].loc[cols, cols], corr["n"].loc[cols, cols]
+
+
+@functools.lru_cache(maxsize=64)
+def _cluster_order(cols: tuple, method: str, dataset_version: str) -> tuple:
+    matrix, _ = correlation_subset(list(cols), method)
+    if len(cols) < 3:
+        return cols
+    # strongly (anti-)correlated columns end up next to each other,
+    # pairs without enough data count as unrelated
+    distance = 1.0 - np.abs(np.nan_to_num(matrix.to_numpy(), nan=0.0))
+    np.fill_diagonal(distance, 0.0)
+    distance = np.clip((distance + distance.T) / 2, 0.0, None)
+    tree = linkage(squareform(distance, checks=False), method="average", optimal_ordering=True)
+    return tuple(cols[i] for i in leaves_list(tree))
+
+
+def cluster_order(cols: list[str], method: str = "pearson") -> list[str]:
+    """
+    cols reordered by hierarchical clustering on 1 - |correlation|, for heatmap axes.
+    Cached per (cols, method, dataset version).
+    """
+    return list(_cluster_order(tuple(cols), method, get_dataset_version()))
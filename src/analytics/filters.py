@@ -0,0 +1,196 @@
+import base64
+import functools
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+import numbers
+import numpy as np
+from src.data_loading.store import get_dataset, get_dataset_version
+from src.analytics.correlation import numeric_columns
+
+# Range filters over dataset columns.
+# A filter spec maps column -> [low, high] (either side None for open). Each
+# column is sorted once, a range becomes two searchsorted calls, and range masks
+# are cached per (column, low, high) so moving one slider only computes one new
+# mask. The combined row mask is kept server-side under a short hash of the
+# spec; the browser only holds the hash, the spec and the packed bits.
+# Specs come back from the browser, so only numeric dataset columns with
+# [number or None, number or None] bounds are accepted, anything else is dropped.
+
+# how many combined masks are kept per process
+MAX_STORED_MASKS = 256
+
+_lock = threading.Lock()
+_masks = OrderedDict()
+
+
+@functools.lru_cache(maxsize=None)
+def _sorted_column(column: str, dataset_version: str) -> tuple[np.ndarray, np.ndarray]:
+    values = get_dataset()[column].to_numpy(dtype="float64", na_value=np.nan)
+    rows = np.flatnonzero(~np.isnan(values))
+    order = np.argsort(values[rows], kind="stable")
+    return values[rows][order], rows[order]
+
+
+@functools.lru_cache(maxsize=4)
+def _filterable_columns(dataset_version: str) -> frozenset:
+    return frozenset(numeric_columns(get_dataset()))
+
+
+def _bound(value) -> float | None:
+    return None if value is None else float(value)
+
+
+def _valid_bounds(bounds) -> bool:
+    # [low, high], each a real number (not NaN, not bool) or None
+    if not isinstance(bounds, (list, tuple)) or len(bounds) != 2:
+        return False
+    return all(
+        v is None or (isinstance(v, numbers.Real) and not isinstance(v, bool) and not np.isnan(v))
+        for v in bounds
+    )
+
+
+def normalize_spec(ranges: dict) -> dict:
+    """
+    Canonical filter spec: bounds as floats, bounds that don't exclude any value
+    dropped (a slider left at the full data range is no filter), columns sorted.
+    A column with both bounds dropped is removed, so its missing values are kept.
+    Entries for unknown or non-numeric columns and malformed bounds are ignored.
+
+    @param ranges: Dictionary column -> (low, high), either may be None.
+    @return: Dictionary column -> [low, high] with only active filters.
+    """
+    if not isinstance(ranges, dict):
+        return {}
+    version = get_dataset_version()
+    filterable = _filterable_columns(version)
+    spec = {}
+    for column in sorted(c for c in ranges if isinstance(c, str) and c in filterable):
+        if not _valid_bounds(ranges[column]):
+            continue
+        low, high = (_bound(v) for v in ranges[column])
+        values, _ = _sorted_column(column, version)
+        if len(values):
+            if low is not None and low <= values[0]:
+                low = None
+            if high is not None and high >= values[-1]:
+                high = None
+        if low is not None or high is not None:
+            spec[column] = [low, high]
+    return spec
+
+
+def spec_hash(spec: dict) -> str:
+    """
+    Short stable id of a normalized spec (includes the dataset version).
+    """
+    text = json.dumps([get_dataset_version(), spec], sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+@functools.lru_cache(maxsize=1024)
+def _range_mask(column: str, low: float | None, high: float | None, dataset_version: str) -> np.ndarray:
+    values, rows = _sorted_column(column, dataset_version)
+    start = 0 if low is None else np.searchsorted(values, low, side="left")
+    stop = len(values) if high is None else np.searchsorted(values, high, side="right")
+
+    mask = np.zeros(len(get_dataset()), dtype=bool)
+    mask[rows[start:stop]] = True
+    mask.flags.writeable = False
+    return mask
+
+
+def range_mask(column: str, low: float | None, high: float | None) -> np.ndarray:
+    """
+    Rows with low <= column <= high (missing values never match). Cached, read-only.
+    """
+    return _range_mask(column, _bound(low), _bound(high), get_dataset_version())
+
+
+def build_mask(spec: dict) -> np.ndarray:
+    """
+    AND of the range masks of a normalized spec.
+    """
+    mask = np.ones(len(get_dataset()), dtype=bool)
+    for column, (low, high) in spec.items():
+        mask &= range_mask(column, low, high)
+    mask.flags.writeable = False
+    return mask
+
+
+def _stored_mask(key: str, spec: dict) -> np.ndarray:
+    with _lock:
+        if key in _masks:
+            _masks.move_to_end(key)
+            return _masks[key]
+
+    mask = build_mask(spec)
+    with _lock:
+        _masks[key] = mask
+        while len(_masks) > MAX_STORED_MASKS:
+            _masks.popitem(last=False)
+    return mask
+
+
+def encode_mask(mask: np.ndarray) -> str:
+    """
+    Row mask as base64 of its bits (little bit order), 1 bit per row.
+    """
+    return base64.b64encode(np.packbits(mask, bitorder="little").tobytes()).decode("ascii")
+
+
+def apply_filters(ranges: dict) -> dict:
+    """
+    Normalize ranges, compute (or reuse) the combined mask and return the
+    compact form kept in the browser's filters store.
+
+    @param ranges: Dictionary column -> (low, high).
+    @return: {} when nothing is filtered, else {"hash", "spec", "count", "bits"}.
+    """
+    spec = normalize_spec(ranges)
+    if not spec:
+        return {}
+    key = spec_hash(spec)
+    mask = _stored_mask(key, spec)
+    return {"hash": key, "spec": spec, "count": int(mask.sum()), "bits": encode_mask(mask)}
+
+
+def filter_key(spec: dict) -> str:
+    """
+    Key of a normalized spec for cached figure builders: the spec as canonical
+    JSON, so mask_for_key can always rebuild the mask from it.
+    """
+    return json.dumps(spec, sort_keys=True, separators=(",", ":"))
+
+
+def resolve_filters(filters: dict | None) -> tuple[str | None, np.ndarray | None]:
+    """
+    Key and row mask for the contents of the filters store.
+
+    The spec comes from the browser, so it is validated, normalized and hashed
+    again here (see normalize_spec) instead of trusting the stored hash; the
+    mask is rebuilt if this process hasn't seen it yet (another worker, restart).
+
+    @return: Tuple of (filter_key of the spec, read-only bool array over the
+        dataset rows), (None, None) when nothing is filtered.
+    """
+    if not isinstance(filters, dict) or not filters.get("spec"):
+        return None, None
+    spec = normalize_spec(filters["spec"])
+    if not spec:
+        return None, None
+    return filter_key(spec), _stored_mask(spec_hash(spec), spec)
+
+
+def mask_for_key(key: str | None) -> np.ndarray | None:
+    """
+    Row mask for a key returned by resolve_filters (None for no filter).
+    For cached figure builders that take the key as part of their cache key;
+    the mask is taken from the store or rebuilt from the spec in the key.
+    """
+    if key is None:
+        return None
+    spec = json.loads(key)
+    return _stored_mask(spec_hash(spec), spec)
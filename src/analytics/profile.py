@@ -0,0 +1,173 @@
+import functools
+import json
+import numpy as np
+import pandas as pd
+from src.data_loading.store import get_dataset_version, get_derived
+from src.analytics.correlation import numeric_columns
+from src.analytics.stats import build_stats, get_stats
+
+# Dataset profile: what analyse_distribution used to return, as columnar tables.
+# Numeric columns come from the statistics catalogue (one NaN-aware pass over
+# the numeric block). Every other column is counted in one go: the block is
+# flattened, factorized once, and (column, value) pairs are counted together,
+# so the cost grows with the number of cells, not with a per-column loop.
+
+# values per categorical column in the endpoint payload
+DEFAULT_TOP_VALUES = 20
+
+
+def _numeric_distinct(x: np.ndarray) -> np.ndarray:
+    # distinct non-NaN values per column (NaN sorts last)
+    s = np.sort(x, axis=0)
+    valid = ~np.isnan(s)
+    changes = (s[1:] != s[:-1]) & valid[1:]
+    return valid[:1].sum(axis=0) + changes.sum(axis=0)
+
+
+def _frequencies(df: pd.DataFrame, columns: list[str]) -> pd.DataFrame:
+    """
+    Value counts (missing values included) of every column in columns.
+
+    @return: DataFrame (column, value, count), ordered by column, then by
+        count descending, ties in order of first appearance (as value_counts).
+    """
+    if not columns:
+        return pd.DataFrame({"column": pd.Categorical([]), "value": [], "count": np.array([], dtype=np.int64)})
+    rows = len(df)
+    flat = df[columns].to_numpy(dtype=object).ravel(order="F")
+    codes, uniques = pd.factorize(flat, use_na_sentinel=False)
+
+    key = np.repeat(np.arange(len(columns), dtype=np.int64), rows) * len(uniques) + codes
+    keys, first, counts = np.unique(key, return_index=True, return_counts=True)
+    col, code = keys // len(uniques), keys % len(uniques)
+
+    order = np.lexsort((first, -counts, col))
+    return pd.DataFrame({
+        "column": pd.Categorical.from_codes(col[order], categories=columns),
+        "value": np.asarray(uniques, dtype=object)[code[order]],
+        "count": counts[order],
+    })
+
+
+def build_profile(df: pd.DataFrame, stats: dict | None = None) -> dict:
+    """
+    Profile of every column of df.
+
+    @param df: Dataset.
+    @param stats: build_stats(df) if already computed.
+    @return: Dictionary with
+        columns     - DataFrame indexed by column: kind ("numeric" or "categorical"),
+                      dtype, count, nulls, null_fraction, distinct, top (most frequent
+                      non-missing value, categorical only) and top_count
+        numeric     - statistics catalogue table (see analytics.stats)
+        frequencies - value counts of the categorical columns, one row per (column, value)
+    """
+    if stats is None:
+        stats = build_stats(df)
+    numeric = numeric_columns(df)
+    numeric_set = set(numeric)
+    categorical = [c for c in df.columns if c not in numeric_set]
+
+    freq = _frequencies(df, categorical)
+    codes = freq["column"].cat.codes.to_numpy()
+    is_null = pd.isna(freq["value"]).to_numpy()
+    cat_nulls = np.bincount(codes[is_null], weights=freq["count"].to_numpy()[is_null], minlength=len(categorical))
+    cat_distinct = np.bincount(codes[~is_null], minlength=len(categorical))
+
+    # most frequent non-missing value per column (first such row of each column block)
+    present = freq[~is_null]
+    present_codes = codes[~is_null]
+    starts = np.flatnonzero(np.r_[True, present_codes[1:] != present_codes[:-1]]) if len(present) else np.array([], dtype=int)
+    top_index = np.asarray(categorical, dtype=object)[present_codes[starts]]
+    top = pd.Series(present["value"].to_numpy()[starts], index=top_index, dtype=object)
+    top_count = pd.Series(present["count"].to_numpy()[starts], index=top_index)
+
+    table = stats["table"]
+    x = df[numeric].to_numpy(dtype="float64", na_value=np.nan)
+    columns = pd.DataFrame(
+        {
+            "kind": ["numeric"] * len(numeric) + ["categorical"] * len(categorical),
+            "dtype": [str(df[c].dtype) for c in numeric + categorical],
+            "count": np.r_[table["count"].to_numpy(), len(df) - cat_nulls].astype(np.int64),
+            "nulls": np.r_[table["nulls"].to_numpy(), cat_nulls].astype(np.int64),
+            "distinct": np.r_[_numeric_distinct(x), cat_distinct].astype(np.int64),
+        },
+        index=pd.Index(numeric + categorical, name="column"),
+    )
+    columns["null_fraction"] = columns["nulls"] / len(df) if len(df) else np.nan
+    columns["top"] = top.reindex(columns.index)
+    columns["top_count"] = top_count.reindex(columns.index).astype("Int64")
+
+    return {
+        "columns": columns.loc[df.columns].rename_axis("column"),
+        "numeric": table,
+        "frequencies": freq,
+    }
+
+
+def get_profile() -> dict:
+    """
+    Shared build_profile of the canonical dataset, built on first use and
+    reusing the statistics catalogue.
+    """
+    return get_derived("profile", lambda df: build_profile(df, get_stats()))
+
+
+def _json_ready(values) -> list:
+    # NaN/NA -> None, numpy scalars -> python
+    return [None if pd.isna(v) else (v.item() if isinstance(v, np.generic) else v) for v in values]
+
+
+def _text(value):
+    # categorical values (dates, mixed objects) go out as strings
+    return value if pd.isna(value) else str(value)
+
+
+def _frame_payload(frame: pd.DataFrame) -> dict:
+    return {name: _json_ready(frame[name].to_numpy(dtype=object)) for name in frame.columns}
+
+
+def profile_payload(columns: list[str] | None = None, top: int = DEFAULT_TOP_VALUES) -> dict:
+    """
+    JSON-ready, columnar form of the profile (each table as {field: list}).
+
+    @param columns: Only these columns (unknown ones are ignored), all by default.
+    @param top: Most frequent values kept per categorical column.
+    @return: Dictionary with version, columns (with a "column" field),
+        numeric (with a "column" field) and frequencies.
+    """
+    profile = get_profile()
+    info, numeric, freq = profile["columns"], profile["numeric"], profile["frequencies"]
+    if columns is not None:
+        info = info[info.index.isin(columns)]
+        numeric = numeric[numeric.index.isin(columns)]
+        freq = freq[freq["column"].isin(columns)]
+    info = info.assign(top=info["top"].map(_text))
+    # frequencies are sorted within each column, keep the first `top` rows
+    freq = freq[freq.groupby("column", observed=True).cumcount().to_numpy() < top]
+
+    return {
+        "version": get_dataset_version(),
+        "columns": _frame_payload(info.reset_index()),
+        "numeric": _frame_payload(numeric.reset_index()),
+        "frequencies": {
+            "column": freq["column"].astype(str).tolist(),
+            "value": _json_ready(freq["value"].map(_text)),
+            "count": freq["count"].tolist(),
+        },
+    }
+
+
+@functools.lru_cache(maxsize=4)
+def _default_profile_json(dataset_version: str) -> str:
+    return json.dumps(profile_payload())
+
+
+def profile_json(columns: list[str] | None = None, top: int = DEFAULT_TOP_VALUES) -> str:
+    """
+    profile_payload as a JSON string. The default (every column, default top)
+    is serialized once per dataset version.
+    """
+    if columns is None and top == DEFAULT_TOP_VALUES:
+        return _default_profile_json(get_dataset_version())
+    return json.dumps(profile_payload(columns, top))
@@ -0,0 +1,159 @@
+import functools
+import numpy as np
+import pandas as pd
+from src.data_loading.store import get_dataset, get_dataset_version
+from src.data_loading.country_index import lookup_country
+from src.analytics.stats import column_range
+
+# Leaderboard rankings.
+# A rank index holds, for one metric, the direction-adjusted 0-100 scores and
+# the stable best-first order of every country with a value. Top/bottom N is a
+# slice of that order; rank and percentile of any country are lookups.
+
+
+def _scores(
+    df: pd.DataFrame,
+    metric: str,
+    lower_is_better: bool,
+    bounds: tuple[float, float] | None = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    @param bounds: (min, max) of the metric if already known (statistics
+        catalogue), computed from the values otherwise.
+    @return: Tuple of (rows with a value, raw values, scores). Scores are the
+        values (negated when lower is better) min-max scaled to 0-100, left
+        unscaled if all values are equal.
+    """
+    values = df[metric].to_numpy(dtype="float64", na_value=np.nan)
+    rows = np.flatnonzero(~np.isnan(values))
+    raw = values[rows]
+
+    score = -raw if lower_is_better else raw.copy()
+    if len(score):
+        low, high = bounds if bounds is not None else (raw.min(), raw.max())
+        min_val, max_val = (-high, -low) if lower_is_better else (low, high)
+        if max_val > min_val:
+            score = (score - min_val) / (max_val - min_val) * 100
+    return rows, raw, score
+
+
+def build_rank_index(
+    df: pd.DataFrame,
+    metric: str,
+    lower_is_better: bool = False,
+    bounds: tuple[float, float] | None = None,
+) -> dict:
+    """
+    Full ranking of one metric.
+
+    @param df: Dataset with the metric column.
+    @param metric: Column to rank.
+    @param lower_is_better: Rank low values first.
+    @param bounds: (min, max) of the metric if already known.
+    @return: Dictionary with
+        rows, raw, score - countries with a value (positions in df), their value and score
+        order            - positions into rows/raw/score, best first (stable for ties)
+        rank             - 1-based rank per df row, NaN without a value
+        percentile       - share of ranked countries doing worse, 0-100, per df row
+    """
+    rows, raw, score = _scores(df, metric, lower_is_better, bounds)
+    order = np.argsort(-score, kind="stable")
+
+    m = len(rows)
+    rank = np.full(len(df), np.nan)
+    rank[rows[order]] = np.arange(1, m + 1)
+    percentile = (m - rank) / (m - 1) * 100 if m > 1 else np.where(np.isnan(rank), np.nan, 100.0)
+
+    return {
+        "metric": metric,
+        "lower_is_better": lower_is_better,
+        "rows": rows,
+        "raw": raw,
+        "score": score,
+        "order": order,
+        "rank": rank,
+        "percentile": percentile,
+    }
+
+
+@functools.lru_cache(maxsize=128)
+def _cached_index(metric: str, lower_is_better: bool, dataset_version: str) -> dict:
+    index = build_rank_index(get_dataset(), metric, lower_is_better, column_range(metric))
+    for value in index.values():
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+    return index
+
+
+def get_rank_index(metric: str, lower_is_better: bool = False) -> dict:
+    """
+    Cached build_rank_index on the canonical dataset, one per (metric,
+    direction, dataset version). The arrays are read-only.
+    """
+    return _cached_index(metric, bool(lower_is_better), get_dataset_version())
+
+
+def top_from_index(index: dict, k: int, bottom: bool = False, mask: np.ndarray | None = None) -> np.ndarray:
+    """
+    Positions (into index rows/raw/score) of the k best countries, best first,
+    or the k worst, worst first.
+
+    @param mask: Optional bool array over the dataset rows, only countries
+        where it is True are picked.
+    """
+    order = index["order"]
+    if mask is not None:
+        order = order[mask[index["rows"][order]]]
+    return order[::-1][:k] if bottom else order[:k]
+
+
+def partial_ranking(
+    df: pd.DataFrame,
+    metric: str,
+    k: int,
+    lower_is_better: bool = False,
+    bottom: bool = False,
+    mask: np.ndarray | None = None,
+    bounds: tuple[float, float] | None = None,
+) -> dict:
+    """
+    Top (or bottom) k of a metric without sorting the whole column, for ad-hoc
+    metrics that have no rank index. Uses argpartition and only sorts the k picked.
+
+    @param mask: Optional bool array over the df rows, only countries where it
+        is True are picked (scores are still scaled over all countries).
+    @param bounds: (min, max) of the metric if already known.
+    @return: Dictionary with rows, raw, score (as in build_rank_index) and
+        order holding the k picked positions, best first (worst first for bottom).
+    """
+    rows, raw, score = _scores(df, metric, lower_is_better, bounds)
+    key = score if bottom else -score
+    candidates = np.arange(len(key)) if mask is None else np.flatnonzero(mask[rows])
+    k = min(k, len(candidates))
+    if k == 0:
+        picked = np.array([], dtype=int)
+    else:
+        picked = candidates[np.argpartition(key[candidates], k - 1)[:k]]
+        picked = picked[np.argsort(key[picked], kind="stable")]
+    return {"metric": metric, "rows": rows, "raw": raw, "score": score, "order": picked}
+
+
+def country_rank(metric: str, iso3: str, lower_is_better: bool = False) -> dict | None:
+    """
+    Where a country stands on a metric.
+
+    @return: {"rank", "of", "percentile"} or None if the country is unknown or
+        has no value for the metric.
+    """
+    record = lookup_country(iso3)
+    if record is None:
+        return None
+    index = get_rank_index(metric, lower_is_better)
+    rank = index["rank"][record["row"]]
+    if np.isnan(rank):
+        return None
+    return {
+        "rank": int(rank),
+        "of": len(index["rows"]),
+        "percentile": float(index["percentile"][record["row"]]),
+    }
@@ -0,0 +1,103 @@
+import functools
+import numpy as np
+import pandas as pd
+from src.data_loading.store import get_dataset, get_dataset_version
+
+# Simple linear fits (y ~ a + b*x, optionally with log(x)) between two columns
+# of the canonical dataset.
+# A fit keeps everything the scatter needs (rows used, predictions, residuals
+# and their sort order), so changing top N or toggling the regression line
+# is slicing into a cached fit instead of a refit.
+
+
+def _moment_fit(x: np.ndarray, y: np.ndarray) -> tuple[float, float]:
+    """
+    Least squares line from centred moment sums.
+
+    @return: Tuple of (slope, intercept). Slope is 0 when x is constant,
+        both are NaN when there are no points.
+    """
+    n = len(x)
+    if n == 0:
+        return np.nan, np.nan
+    mx, my = x.sum() / n, y.sum() / n
+    dx = x - mx
+    sxx = np.dot(dx, dx)
+    sxy = np.dot(dx, y - my)
+    slope = sxy / sxx if sxx > 0 else 0.0
+    return float(slope), float(my - slope * mx)
+
+
+def fit_regression(df: pd.DataFrame, x_col: str, y_col: str, log_x: bool) -> dict:
+    """
+    Fit y_col against x_col (or log(x_col)) over the rows where both are present.
+
+    @param df: Dataset with both columns.
+    @param x_col: Column used as predictor.
+    @param y_col: Column being explained.
+    @param log_x: Use log(x) in the model, rows with x <= 0 are dropped.
+    @return: Dictionary with slope, intercept and per row arrays (all aligned):
+        rows (positions in df), x, y, x_model, predicted, residual (y - predicted)
+        and order (stable argsort of residual, most negative first).
+    """
+    x = df[x_col].to_numpy(dtype="float64", na_value=np.nan)
+    y = df[y_col].to_numpy(dtype="float64", na_value=np.nan)
+
+    valid = ~np.isnan(x) & ~np.isnan(y)
+    if log_x:
+        valid &= x > 0
+    rows = np.flatnonzero(valid)
+    x, y = x[rows], y[rows]
+    x_model = np.log(x) if log_x else x
+
+    slope, intercept = _moment_fit(x_model, y)
+    predicted = intercept + slope * x_model
+    residual = y - predicted
+
+    return {
+        "x_col": x_col,
+        "y_col": y_col,
+        "log_x": log_x,
+        "slope": slope,
+        "intercept": intercept,
+        "rows": rows,
+        "x": x,
+        "y": y,
+        "x_model": x_model,
+        "predicted": predicted,
+        "residual": residual,
+        "order": np.argsort(residual, kind="stable"),
+    }
+
+
+@functools.lru_cache(maxsize=1024)
+def _cached_fit(x_col: str, y_col: str, log_x: bool, dataset_version: str) -> dict:
+    fit = fit_regression(get_dataset(), x_col, y_col, log_x)
+    # shared between requests, make sure nobody edits the arrays in place
+    for value in fit.values():
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+    return fit
+
+
+def get_fit(x_col: str, y_col: str, log_x: bool) -> dict:
+    """
+    Cached fit_regression on the canonical dataset, keyed by
+    (x_col, y_col, log_x, dataset version). The arrays are read-only.
+    """
+    return _cached_fit(x_col, y_col, bool(log_x), get_dataset_version())
+
+
+def precompute_fits(x_cols: list[str], y_cols: list[str]) -> int:
+    """
+    Fill the fit cache for every (x, y) pair, with and without log(x).
+
+    @return: Number of fits computed.
+    """
+    count = 0
+    for x_col in x_cols:
+        for y_col in y_cols:
+            for log_x in (False, True):
+                get_fit(x_col, y_col, log_x)
+                count += 1
+    return count
@@ -0,0 +1,145 @@
+import warnings
+import numpy as np
+import pandas as pd
+from src.data_loading.store import get_derived
+from src.analytics.correlation import numeric_columns
+
+# Column statistics catalogue.
+# Every numeric column is summarized in one NaN-aware pass over the numeric
+# block of the dataset (one 2d array, reductions along the rows), built once
+# per dataset version. Slider bounds, ranking scales and summaries read from it
+# instead of calling min()/max()/describe() on the frame again.
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+HISTOGRAM_BINS = 20
+
+STAT_COLUMNS = ["count", "nulls", "null_fraction", "min", "max", "mean", "std"] + [
+    f"q{int(q * 100):02d}" for q in QUANTILES
+]
+
+
+def _histograms(x: np.ndarray, low: np.ndarray, high: np.ndarray, bins: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Equal-width histograms of every column of x between its min and max.
+
+    @return: Tuple of (edges (cols, bins + 1), counts (cols, bins)). Columns
+        without values have NaN edges and zero counts; constant columns put
+        every value in the first bin.
+    """
+    rows, cols = x.shape
+    edges = low[:, None] + (high - low)[:, None] * np.linspace(0.0, 1.0, bins + 1)[None, :]
+
+    valid = ~np.isnan(x)
+    width = np.where(high > low, high - low, 1.0)
+    with np.errstate(invalid="ignore"):
+        position = np.floor((x - low) / width * bins)
+    # the max lands on the right edge of the last bin
+    position = np.clip(np.nan_to_num(position, nan=0.0), 0, bins - 1).astype(np.int64)
+
+    flat = (position + np.arange(cols) * bins)[valid]
+    counts = np.bincount(flat, minlength=cols * bins).reshape(cols, bins)
+    return edges, counts
+
+
+def build_stats(df: pd.DataFrame, bins: int = HISTOGRAM_BINS) -> dict:
+    """
+    Statistics of every numeric column of df.
+
+    @param df: Dataset.
+    @param bins: Number of histogram bins per column.
+    @return: Dictionary with
+        table - DataFrame indexed by column with STAT_COLUMNS (std with ddof=1, as describe())
+        edges - {column: array of bins + 1 bin edges}
+        counts - {column: array of bins counts}
+    """
+    columns = numeric_columns(df)
+    x = df[columns].to_numpy(dtype="float64", na_value=np.nan)
+
+    count = (~np.isnan(x)).sum(axis=0)
+    with warnings.catch_warnings():
+        # all-NaN columns just give NaN statistics
+        warnings.simplefilter("ignore", RuntimeWarning)
+        low = np.nanmin(x, axis=0)
+        high = np.nanmax(x, axis=0)
+        mean = np.nanmean(x, axis=0)
+        std = np.nanstd(x, axis=0, ddof=1)
+        quantiles = np.nanquantile(x, QUANTILES, axis=0)
+
+    table = pd.DataFrame(
+        {
+            "count": count,
+            "nulls": len(df) - count,
+            "null_fraction": (len(df) - count) / len(df) if len(df) else np.nan,
+            "min": low,
+            "max": high,
+            "mean": mean,
+            "std": std,
+            **{name: quantiles[i] for i, name in enumerate(STAT_COLUMNS[-len(QUANTILES):])},
+        },
+        index=pd.Index(columns, name="column"),
+    )
+
+    edges, counts = _histograms(x, low, high, bins)
+    return {
+        "table": table,
+        "edges": dict(zip(columns, edges)),
+        "counts": dict(zip(columns, counts)),
+    }
+
+
+def get_stats() -> dict:
+    """
+    Shared build_stats of the canonical dataset, built on first use.
+    """
+    return get_derived("column_stats", build_stats)
+
+
+def column_range(column: str) -> tuple[float, float]:
+    """
+    (min, max) of a numeric column, NaN for a column without values.
+    """
+    row = get_stats()["table"].loc[column]
+    return float(row["min"]), float(row["max"])
+
+
+def slider_bounds(column: str, step: float) -> tuple[float, float]:
+    """
+    Column range widened to multiples of step, for slider min/max.
+    """
+    low, high = column_range(column)
+    # round away float noise from steps like 0.1
+    return round(float(np.floor(low / step) * step), 10), round(float(np.ceil(high / step) * step), 10)
+
+
+def column_summary(column: str) -> dict:
+    """
+    JSON-ready statistics of one numeric column.
+
+    @return: Dictionary with the STAT_COLUMNS values (None for NaN) and a
+        histogram {"edges", "counts"}.
+    """
+    stats = get_stats()
+    row = stats["table"].loc[column]
+    out = {
+        name: None if pd.isna(row[name]) else (int(row[name]) if name in ("count", "nulls") else float(row[name]))
+        for name in STAT_COLUMNS
+    }
+    edges = stats["edges"][column]
+    out["histogram"] = {
+        "edges": None if np.isnan(edges).any() else edges.tolist(),
+        "counts": stats["counts"][column].tolist(),
+    }
+    return out
+
+
+def summary(columns: list[str] | None = None) -> dict:
+    """
+    column_summary for several columns (every numeric column by default).
+
+    @return: Dictionary column -> column_summary. Unknown or non-numeric
+        columns are left out.
+    """
+    table = get_stats()["table"]
+    if columns is None:
+        columns = table.index
+    return {c: column_summary(c) for c in columns if c in table.index}
@@ -1,7 +1,11 @@
 from dash import Dash
+from flask import Response, request
 import dash_bootstrap_components as dbc
 from src.pages.main_layout import get_layout
 from dash_bootstrap_templates import load_figure_template
+from src.analytics.profile import DEFAULT_TOP_VALUES, profile_json
+from src.monitoring.callback_metrics import init_callback_metrics
+from src.monitoring.request_profiler import init_request_profiler
 import pathlib
 
 # At first we set up for single page apps, can be later extended to multi page apps
@@ -19,6 +23,22 @@ app = Dash(
 )
 
 server = app.server
+# per-callback latency/size metrics at /metrics
+init_callback_metrics(app)
+# cProfile of single callback requests, only with VISUALIZATION_PROFILE_TOKEN set
+init_request_profiler(app)
+
+
+@server.route("/api/profile")
+def profile_endpoint():
+    """
+    Dataset profile as columnar JSON (see analytics.profile.profile_payload).
+    Optional query args: column (repeatable) to restrict the columns, top for
+    the number of values per categorical column.
+    """
+    columns = request.args.getlist("column") or None
+    top = max(request.args.get("top", DEFAULT_TOP_VALUES, type=int), 0)
+    return Response(profile_json(columns, top), mimetype="application/json")
 
 #assign the function, not the result
 app.layout = get_layout
@@ -0,0 +1,109 @@
+// Clientside metric switching for the home map.
+// The server ships every view metric once (see map_payload in pages/home.py),
+// switching metrics (or filters) only rebuilds the two choropleth traces in
+// the browser.
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    map: {
+        switch_metric: function (selectedColumn, filters, payload) {
+            if (!payload) {
+                return window.dash_clientside.no_update;
+            }
+            // row mask of the active filter (see analytics/filters.py), null = no filter
+            const passes = filters && filters.bits ? decodeBits(filters.bits) : null;
+            const kept = (i) => !passes || passes[i];
+
+            if (!selectedColumn || !(selectedColumn in payload.metrics)) {
+                return passes ? filterOutline(payload, kept) : payload.initial_figure;
+            }
+
+            const values = decodeColumn(payload.metrics[selectedColumn]);
+            const hasData = decodeColumn(payload.has_data);
+
+            const locations = [], z = [], hovertext = [];
+            const emptyLocations = [], emptyText = [];
+            for (let i = 0; i < payload.iso3.length; i++) {
+                const hasValue = hasData[i] && !Number.isNaN(values[i]);
+                if (hasValue && kept(i)) {
+                    locations.push(payload.iso3[i]);
+                    z.push(values[i]);
+                    hovertext.push(payload.country[i]);
+                } else {
+                    emptyLocations.push(payload.iso3[i]);
+                    emptyText.push(hasValue ? "Filtered out" : "No data available");
+                }
+            }
+
+            return {
+                data: [
+                    {
+                        type: "choropleth",
+                        locations: locations,
+                        z: Float32Array.from(z),
+                        colorscale: payload.colorscale,
+                        hovertext: hovertext,
+                        hoverinfo: "text+z",
+                    },
+                    {
+                        type: "choropleth",
+                        locations: emptyLocations,
+                        z: new Float32Array(emptyLocations.length),
+                        showscale: false,
+                        hovertext: emptyText,
+                        hoverinfo: "text",
+                        marker: {line: {width: 0.8}},
+                        colorscale: [[0, "rgba(0,0,0,0)"], [1, "rgba(0,0,0,0)"]],
+                    },
+                ],
+                layout: Object.assign({}, payload.layout, {
+                    title: {text: payload.titles[selectedColumn]},
+                }),
+            };
+        },
+    },
+});
+
+// outline map with only the countries passing the filter in the first trace
+// (that trace has one entry per dataset row, in row order)
+function filterOutline(payload, kept) {
+    const figure = payload.initial_figure;
+    const outline = figure.data[0];
+    const pick = (arr) => Array.isArray(arr) ? arr.filter((v, i) => kept(i)) : arr;
+
+    return Object.assign({}, figure, {
+        data: [
+            Object.assign({}, outline, {
+                locations: pick(outline.locations),
+                z: pick(outline.z),
+                hovertext: pick(outline.hovertext),
+            }),
+            ...figure.data.slice(1),
+        ],
+    });
+}
+
+// base64 bitmask (little bit order) -> array of booleans
+function decodeBits(bits) {
+    const raw = atob(bits);
+    const out = [];
+    for (let i = 0; i < raw.length; i++) {
+        const byte = raw.charCodeAt(i);
+        for (let b = 0; b < 8; b++) {
+            out.push((byte >> b) & 1);
+        }
+    }
+    return out;
+}
+
+// {dtype, bdata} column from the payload -> typed array
+function decodeColumn(column) {
+    const raw = atob(column.bdata);
+    const bytes = new Uint8Array(raw.length);
+    for (let i = 0; i < raw.length; i++) {
+        bytes[i] = raw.charCodeAt(i);
+    }
+    if (column.dtype === "float32") {
+        return new Float32Array(bytes.buffer);
+    }
+    return bytes;
+}
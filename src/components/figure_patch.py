@@ -0,0 +1,75 @@
+from dash import Patch
+
+# Partial figure updates.
+# Callbacks whose figures keep the same traces and static layout (geo settings,
+# template, margins) only need to resend the data arrays and the title. These
+# helpers turn a freshly built figure into a dash Patch that overwrites just
+# the listed keys, so the browser keeps everything else it already has.
+
+
+def _figure_json(figure) -> dict:
+    return figure if isinstance(figure, dict) else figure.to_plotly_json()
+
+
+def _get_path(obj, path: str):
+    for part in path.split("."):
+        if not isinstance(obj, dict) or part not in obj:
+            return None
+        obj = obj[part]
+    return obj
+
+
+def _set_path(patched: Patch, path: str, value) -> None:
+    *parents, last = path.split(".")
+    for part in parents:
+        patched = patched[part]
+    patched[last] = value
+
+
+def trace_keys(*figures) -> list[set]:
+    """
+    Trace keys used by any of the states a callback can produce.
+
+    Collects every top level trace key (except the trace type) of the given
+    figures, so a patch built from one state also clears properties that only
+    exist in another.
+
+    @param figures: Example figures (go.Figure or plotly json dict), all with
+        the same number of traces.
+    @return: One key set per trace.
+    """
+    keys = []
+    for figure in figures:
+        for i, trace in enumerate(_figure_json(figure).get("data", [])):
+            if i == len(keys):
+                keys.append(set())
+            keys[i].update(k for k in trace if k != "type")
+    return keys
+
+
+def figure_patch(figure, keys: list[set], layout_keys) -> Patch:
+    """
+    Patch that turns any figure with the same trace structure into figure.
+
+    Keys missing from figure are set to None, which plotly treats as unset.
+
+    @param figure: Target figure (go.Figure or plotly json dict).
+    @param keys: Keys to overwrite per trace, from trace_keys.
+    @param layout_keys: Layout keys to overwrite, dotted paths allowed
+        ('yaxis.categoryarray').
+    @return: dash Patch for a figure Output.
+    """
+    fig = _figure_json(figure)
+    data = fig.get("data", [])
+    if len(data) != len(keys):
+        raise ValueError(f"figure has {len(data)} traces, expected {len(keys)}")
+
+    patched = Patch()
+    for i, (trace, names) in enumerate(zip(data, keys)):
+        for key in sorted(names):
+            patched["data"][i][key] = trace.get(key)
+
+    layout = fig.get("layout", {})
+    for path in sorted(layout_keys):
+        _set_path(patched["layout"], path, _get_path(layout, path))
+    return patched
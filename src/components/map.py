@@ -1,36 +1,38 @@
 # I'll try to make the interactive chlorplet map here
+import functools
 import pandas as pd
 from dash import Dash, html, dcc, Input, Output, State, callback
 import dash_bootstrap_components as dbc
 import plotly.express as px
 import plotly.graph_objects as go
-from src.data_preprocessing.preprocessing import load_data, get_ISO3, clean_country_names, merge_data
+from src.data_loading.store import get_dataset, get_dataset_version, get_derived
+from src.analytics.filters import mask_for_key
 from dash_bootstrap_templates import load_figure_template
 
 load_figure_template("darkly")
 
-def generate_choropleth() -> go.Figure:
+# columns that don't count as data when deciding if a country has any
+ID_COLUMNS = ["Country", "ISO3"]
 
-    df = load_data()
-    df = merge_data(df)
-    df = clean_country_names(df)
 
-    cols_to_ignore = ["Country", "ISO3"]  
-    mask = df.drop(columns=cols_to_ignore).isna().all(axis=1)
-    
-    only_nas = df[mask]
-    
-    fig = go.Figure(go.Choropleth(
-        locations=df["ISO3"],
-        z=[1] * len(df),  # dummy value so Plotly draws the shapes
-        colorscale=[[0, "rgba(0,0,0,0)"], [1, "rgba(0,0,0,0)"]],  # fully transparent fill
-        showscale=False,
-        hovertext=df["Country"],
-        hoverinfo="text",
-        marker_line_color="#8cdba9",   # border color
-        marker_line_width=0.8,
-    ))
+def build_empty_mask(df: pd.DataFrame) -> pd.Series:
+    """
+    True for rows that have no value at all apart from the id columns.
+    """
+    return df.drop(columns=ID_COLUMNS).isna().all(axis=1)
 
+
+def get_empty_mask() -> pd.Series:
+    """
+    Shared all-empty mask over the canonical dataset, built on first use.
+    """
+    return get_derived("empty_mask", build_empty_mask)
+
+
+@functools.lru_cache(maxsize=1)
+def _base_layout() -> go.Layout:
+    # geo + background styling shared by every map, validated once
+    fig = go.Figure()
     fig.update_geos(
         projection_type="natural earth",
         fitbounds="locations",
@@ -38,20 +40,41 @@ def generate_choropleth() -> go.Figure:
         showland=True,
         landcolor="#151a22",   # dark land
     )
-    
-
     fig.update_layout(
         margin=dict(l=0, r=0, t=0, b=0),
         paper_bgcolor="#111111",  # outer background
         geo_bgcolor="#111111"
     )
+    return fig.layout
+
+
+@functools.lru_cache(maxsize=32)
+def _outline_map(dataset_version: str, filter_key: str | None) -> go.Figure:
+    df = get_dataset()
+    only_nas = df[get_empty_mask()]
+
+    # with an active filter only the countries that pass it get the outline
+    mask = mask_for_key(filter_key)
+    outlined = df if mask is None else df[mask]
+
+    fig = make_base_map()
+    fig.add_choropleth(
+        locations=outlined["ISO3"],
+        z=[1] * len(outlined),  # dummy value so Plotly draws the shapes
+        colorscale=[[0, "rgba(0,0,0,0)"], [1, "rgba(0,0,0,0)"]],  # fully transparent fill
+        showscale=False,
+        hovertext=outlined["Country"],
+        hoverinfo="text",
+        marker_line_color="#8cdba9",   # border color
+        marker_line_width=0.8,
+    )
 
     fig.add_choropleth(
         locations = only_nas["ISO3"],
-        z = [1] * len(df),
+        z = [1] * len(only_nas),
         #colorscale=[[0, "rgba(0,0,0,0)"], [1, "rgba(0,0,0,0)"]],  # fully transparent fill
         showscale=False,
-        hovertext = "No data available for " + only_nas["Country"],
+        hovertext = "No data available for " + only_nas["Country"].astype(str),
         hoverinfo="text",
         marker_line_color="#E4CFCF",   # border color
         marker_line_width=0.8,
@@ -63,22 +86,20 @@ def generate_choropleth() -> go.Figure:
 
     return fig
 
-def make_base_map() -> go.Figure:
-    fig = go.Figure()
-    fig.update_geos(
-        projection_type="natural earth",
-        fitbounds="locations",
-        visible=False,
-        showland=True,
-        landcolor="#151a22",
-    )
-    fig.update_layout(
-        margin=dict(l=0, r=0, t=0, b=0),
-        paper_bgcolor="#111111",
-        geo_bgcolor="#111111",
-    )
-    return fig
 
+def generate_choropleth(filter_key: str | None = None) -> go.Figure:
+    """
+    Outline map of every country in the canonical dataset, countries without
+    any data get a second, differently coloured outline.
+    Built once per (dataset version, filter) - treat the returned figure as read-only.
 
+    @param filter_key: Key of an active filter from analytics.filters.resolve_filters.
+    """
+    return _outline_map(get_dataset_version(), filter_key)
 
 
+def make_base_map() -> go.Figure:
+    """
+    Empty figure with the shared map layout.
+    """
+    return go.Figure(layout=_base_layout())
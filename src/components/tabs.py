@@ -1,22 +1,76 @@
+import dash
 import dash_bootstrap_components as dbc
 from dash import dcc, html, callback, Output, Input, State, ctx
-from src.data_loading.load_data import load_data_into_df
-import numpy as np
+from src.data_loading.store import get_dataset
+from src.analytics.filters import apply_filters
+from src.analytics.stats import slider_bounds
 
-df = load_data_into_df()
+df = get_dataset()
 
 
+# no active filter (see analytics.filters.apply_filters for the stored format)
 DEFAULT_FILTERS = {
     
 }
 
+# filter sliders, the id of each slider is the column it filters.
+# "range" sliders give [low, high], "min" sliders a lower bound
+FILTER_SLIDERS = {
+    "Real_GDP_per_Capita_USD": "range",
+    "Population_Below_Poverty_Line_percent": "min",
+    "Unemployment_Rate_percent": "min",
+    "Public_Debt_percent_of_GDP": "min",
+    "Total_Literacy_Rate [%]": "min",
+    "Youth_Unemployment_Rate_percent": "min",
+    "Expected_Years_of_Schooling_(years)": "range",
+    "Human_Development_Index_(value)": "range",
+    "Median_Age": "range",
+    "Population_Growth_Rate_(percentage)": "range",
+    "Life_Expectancy_at_Birth_(years)": "range",
+    "Net_Migration_Rate_(per_1,000_population)": "range",
+    "internet_penetration_rate": "range",
+    "electricity_access_percent": "range",
+    "population_density": "range",
+    "Arable_Land (%% of Total Agricultural Land)_%": "range",
+}
+
+# metrics selectable in the Views tab, per view
+VIEW_OPTIONS = {
+    "economy": [
+        {"label": "Real GDP per capita", "value": "Real_GDP_per_Capita_USD"},
+        {"label": "Total GDP (billion USD)", "value": "Real_GDP_PPP_billion_USD"},
+        {"label": "Unemployment Rate", "value": "Unemployment_Rate_percent"},
+        {"label": "Poverty Rate", "value": "Population_Below_Poverty_Line_percent"},
+        {"label": "Public Debt (Percent GDP)", "value": "Public_Debt_percent_of_GDP"},
+    ],
+    "development": [
+        {"label": "Human Development Index", "value": "Human_Development_Index_(value)"},
+        {"label": "Literacy Rate", "value": "Total_Literacy_Rate [%]"},
+        {"label": "Youth Unemployment", "value": "Youth_Unemployment_Rate [%]"},
+        {"label": "Median Age", "value": "Median_Age"},
+        {"label": "Life Expectancy at Birth", "value": "Life_Expectancy_at_Birth_(years)"},
+    ],
+    "demographics": [
+        {"label": "Population Density", "value": "population_density"},
+        {"label": "Population Growth Rate", "value": "Population_Growth_Rate_(percentage)"},
+        {"label": "Fertility Rate", "value": "Total_Fertility_Rate"},
+        {"label": "Arable Land (% of total)", "value": "Arable_Land (%% of Total Agricultural Land)_%"},
+        {"label": "Irrigated Land (% of total agricultural)", "value": "irrigated_land_percent"},
+    ],
+    "infrastructure": [
+        {"label": "Internet Penetration Rate", "value": "internet_penetration_rate"},
+        {"label": "Electricity Access Rate", "value": "electricity_access_percent"},
+        {"label": "Road Density", "value": "road_density_log"},
+        {"label": "Broadband Subscriptions", "value": "broadband_fixed_subscriptions_rate"},
+    ],
+}
+
+# every metric that can be shown on the home map
+VIEW_METRICS = [opt["value"] for opts in VIEW_OPTIONS.values() for opt in opts]
+
 def tab_layout():
     return dbc.Row(
         [ 
-            dcc.Store(
-                id = "filters-store",
-                storage_type="memory",
-            ),
             dbc.Col(
                 [
                     dbc.Tabs(
@@ -100,6 +154,16 @@ def views_content():
     )
 
 def filter_content():
+    # slider ranges come from the statistics catalogue (computed once per dataset)
+    gdp_min, gdp_max = slider_bounds("Real_GDP_per_Capita_USD", 5000)
+    debt_min, debt_max = slider_bounds("Public_Debt_percent_of_GDP", 20)
+    schooling_min, schooling_max = slider_bounds("Expected_Years_of_Schooling_(years)", 5)
+    hdi_min, hdi_max = slider_bounds("Human_Development_Index_(value)", 0.1)
+    age_min, age_max = slider_bounds("Median_Age", 5)
+    growth_min, growth_max = slider_bounds("Population_Growth_Rate_(percentage)", 1)
+    life_min, life_max = slider_bounds("Life_Expectancy_at_Birth_(years)", 5)
+    migration_min, migration_max = slider_bounds("Net_Migration_Rate_(per_1,000_population)", 5)
+    density_min, density_max = slider_bounds("population_density", 20)
 
     economic_filters= dbc.Row(
         [
@@ -107,15 +171,15 @@ def filter_content():
                 [
                     dbc.Label("GDP per Capita Range (USD)", className="ps-4 pe-4"),
                     dcc.RangeSlider(
-                        min = np.floor(df["Real_GDP_per_Capita_USD"].min()/5000)*5000,
-                        max = np.ceil(df["Real_GDP_per_Capita_USD"].max()/5000)*5000,
+                        min = gdp_min,
+                        max = gdp_max,
                         step = 10000,
                         tooltip={"placement": "bottom", "always_visible": True},
                         allowCross=False,
                         id = "Real_GDP_per_Capita_USD",
                         value = [
-                            np.floor(df["Real_GDP_per_Capita_USD"].min()/5000)*5000,
-                            np.ceil(df["Real_GDP_per_Capita_USD"].max()/5000)*5000
+                            gdp_min,
+                            gdp_max
                         ]
                     ),
                 ],
@@ -158,17 +222,17 @@ def filter_content():
                 [
                     dbc.Label("Public debt (% of GDP)", className="ps-4 pe-4"),
                     dcc.Slider(
-                        min = np.floor(df['Public_Debt_percent_of_GDP'].min()/20)*20,
-                        max = np.ceil(df['Public_Debt_percent_of_GDP'].max()/20)*20,
+                        min = debt_min,
+                        max = debt_max,
                         step = None,
                         marks = {i: f'{i}%' for i in range(
-                            int(np.floor(df['Public_Debt_percent_of_GDP'].min()/20)*20),
-                            int(np.ceil(df['Public_Debt_percent_of_GDP'].max()/20)*20) + 1,
+                            int(debt_min),
+                            int(debt_max) + 1,
                             20
                         )},
                         tooltip={"placement": "bottom", "always_visible": True},
                         id="Public_Debt_percent_of_GDP",
-                        value = np.floor(df['Public_Debt_percent_of_GDP'].min()/20)*20
+                        value = debt_min
                     ),
                 ],
                 width=6,
@@ -215,15 +279,15 @@ def filter_content():
                 [
                     dbc.Label("Expected Years Of Schooling", className="ps-4 pe-4"),
                     dcc.RangeSlider(
-                        min = np.floor(df['Expected_Years_of_Schooling_(years)'].min()/5)*5,
-                        max = np.ceil(df['Expected_Years_of_Schooling_(years)'].max()/5)*5,
+                        min = schooling_min,
+                        max = schooling_max,
                         step = 5,
                         tooltip={"placement": "bottom", "always_visible": True},
                         allowCross=False,
                         id="Expected_Years_of_Schooling_(years)",
                         value = [
-                            np.floor(df['Expected_Years_of_Schooling_(years)'].min()/5)*5,
-                            np.ceil(df['Expected_Years_of_Schooling_(years)'].max()/5)*5
+                            schooling_min,
+                            schooling_max
                         ]
                     ),
                 ],
@@ -234,15 +298,15 @@ def filter_content():
                 [
                     dbc.Label("Human Development Index", className="ps-4 pe-4"),
                     dcc.RangeSlider(
-                        min = np.round(np.floor(df['Human_Development_Index_(value)'].min() / 0.1) * 0.1, 2),
-                        max = np.round(np.ceil(df['Human_Development_Index_(value)'].max() / 0.1) * 0.1, 2),
+                        min = hdi_min,
+                        max = hdi_max,
                         step = 0.1,
                         tooltip={"placement": "bottom", "always_visible": True},
                         allowCross=False,
                         id = "Human_Development_Index_(value)",
                         value = [
-                            np.round(np.floor(df['Human_Development_Index_(value)'].min() / 0.1) * 0.1, 2),
-                            np.round(np.ceil(df['Human_Development_Index_(value)'].max() / 0.1) * 0.1, 2)
+                            hdi_min,
+                            hdi_max
                         ]
                     ),
                 ],
@@ -258,15 +322,15 @@ def filter_content():
                 [
                     dbc.Label("Median Age", className="ps-4 pe-4"),
                     dcc.RangeSlider(
-                        min = np.int16(np.floor(df["Median_Age"].min() / 5) * 5),
-                        max = np.int16(np.ceil(df["Median_Age"].max() / 5) * 5),
+                        min = int(age_min),
+                        max = int(age_max),
                         step = 5,
                         tooltip={"placement": "bottom", "always_visible": True},
                         allowCross=False,
                         id="Median_Age",
                         value = [
-                            np.int16(np.floor(df["Median_Age"].min() / 5) * 5),
-                            np.int16(np.ceil(df["Median_Age"].max() / 5) * 5)
+                            int(age_min),
+                            int(age_max)
                         ]
                     ),
                 ],
@@ -277,20 +341,20 @@ def filter_content():
                 [
                     dbc.Label("Population Growth Rate", className="ps-4 pe-4"),
                     dcc.RangeSlider(
-                        min = np.floor(df['Population_Growth_Rate_(percentage)'].min()),
-                        max = np.ceil(df['Population_Growth_Rate_(percentage)'].max()),
+                        min = growth_min,
+                        max = growth_max,
                         step = 1,
                         marks = {i: f'{i}%' for i in range(
-                            int(np.floor(df['Population_Growth_Rate_(percentage)'].min())),
-                            int(np.ceil(df['Population_Growth_Rate_(percentage)'].max())) + 1,
+                            int(growth_min),
+                            int(growth_max) + 1,
                             1
                         )},
                         tooltip={"placement": "bottom", "always_visible": True},
                         allowCross = False,
                         id="Population_Growth_Rate_(percentage)",
                         value = [
-                            np.floor(df['Population_Growth_Rate_(percentage)'].min()),
-                            np.ceil(df['Population_Growth_Rate_(percentage)'].max())
+                            growth_min,
+                            growth_max
                         ]
                     ),
                 ],
@@ -301,15 +365,15 @@ def filter_content():
                 [
                     dbc.Label("Life Expectancy at Birth (years)", className="ps-4 pe-4"),
                     dcc.RangeSlider(
-                        min = np.floor(df['Life_Expectancy_at_Birth_(years)'].min()/5)*5,
-                        max = np.ceil(df['Life_Expectancy_at_Birth_(years)'].max()/5)*5,
+                        min = life_min,
+                        max = life_max,
                         step = 5,
                         tooltip={"placement": "bottom", "always_visible": True},
                         allowCross=False,
                         id="Life_Expectancy_at_Birth_(years)",
                         value = [
-                            np.floor(df['Life_Expectancy_at_Birth_(years)'].min()/5)*5,
-                            np.ceil(df['Life_Expectancy_at_Birth_(years)'].max()/5)*5
+                            life_min,
+                            life_max
                         ]
                     ),
                 ],
@@ -320,15 +384,15 @@ def filter_content():
                 [
                     dbc.Label("Net Migration Rate (per 1,000 population)", className="ps-4 pe-4"),
                     dcc.RangeSlider(
-                        min = np.round(np.floor(df['Net_Migration_Rate_(per_1,000_population)'].min() / 5) * 5, 2),
-                        max = np.round(np.ceil(df['Net_Migration_Rate_(per_1,000_population)'].max() / 5) * 5, 2),
+                        min = migration_min,
+                        max = migration_max,
                         step = 5,
                         tooltip={"placement": "bottom", "always_visible": True},
                         allowCross=False,
                         id="Net_Migration_Rate_(per_1,000_population)",
                         value = [
-                            np.round(np.floor(df['Net_Migration_Rate_(per_1,000_population)'].min() / 5) * 5, 2),
-                            np.round(np.ceil(df['Net_Migration_Rate_(per_1,000_population)'].max() / 5) * 5, 2)
+                            migration_min,
+                            migration_max
                         ]
                     )
                 ],
@@ -380,15 +444,15 @@ def filter_content():
                 [
                     dbc.Label("Population density", className="ps-4 pe-4"),
                     dcc.RangeSlider(
-                        min = np.floor(df['population_density'].min()/20)*20,
-                        max = np.ceil(df['population_density'].max()/20)*20,
+                        min = density_min,
+                        max = density_max,
                         #step = 20,
                         tooltip={"placement": "bottom", "always_visible": True},
                         allowCross=False,
                         id="population_density",
                         value = [
-                            np.floor(df['population_density'].min()/20)*20,
-                            np.ceil(df['population_density'].max()/20)*20
+                            density_min,
+                            density_max
                         ]
                     ),
                 ],  
@@ -457,92 +521,34 @@ def show_tab(active_tab):
     Input("views-dropdown", "value"),
 )
 def update_views(selected_view):
-    options_by_view = {
-        "economy": [
-            {"label": "Real GDP per capita", "value": "Real_GDP_per_Capita_USD"},
-            {"label": "Total GDP (billion USD)", "value": "Real_GDP_PPP_billion_USD"},
-            {"label": "Unemployment Rate", "value": "Unemployment_Rate_percent"},
-            {"label": "Poverty Rate", "value": "Population_Below_Poverty_Line_percent"},
-            {"label": "Public Debt (Percent GDP)", "value": "Public_Debt_percent_of_GDP"},
-        ],
-        "development": [
-            {"label": "Human Development Index", "value": "Human_Development_Index_(value)"},
-            {"label": "Literacy Rate", "value": "Total_Literacy_Rate [%]"},
-            {"label": "Youth Unemployment", "value": "Youth_Unemployment_Rate [%]"},
-            {"label": "Median Age", "value": "Median_Age"},
-            {"label": "Life Expectancy at Birth", "value": "Life_Expectancy_at_Birth_(years)"},
-        ],
-        "demographics": [
-            {"label": "Population Density", "value": "population_density"},
-            {"label": "Population Growth Rate", "value": "Population_Growth_Rate_(percentage)"},
-            {"label": "Fertility Rate", "value": "Total_Fertility_Rate"},
-            {"label": "Arable Land (% of total)", "value": "Arable_Land (%% of Total Agricultural Land)_%"},
-            {"label": "Irrigated Land (% of total agricultural)", "value": "irrigated_land_percent"},
-        ],
-        "infrastructure": [
-            {"label": "Internet Penetration Rate", "value": "internet_penetration_rate"},
-            {"label": "Electricity Access Rate", "value": "electricity_access_percent"},
-            {"label": "Road Density", "value": "road_density_log"},
-            {"label": "Broadband Subscriptions", "value": "broadband_fixed_subscriptions_rate"},
-        ],
-    }
-
-    opts = options_by_view.get(selected_view, [])
+    opts = VIEW_OPTIONS.get(selected_view, [])
     default_value = None
     return opts, default_value
 
 @callback(
-    Output("filter-store", "data"),
+    Output("filters-store", "data"),
     Input("activate-button", "n_clicks"),
     Input("reset-button", "n_clicks"),
-    State("Real_GDP_per_Capita_USD", "value"),
-    State("Population_Below_Poverty_Line_percent", "value"),
-    State("Unemployment_Rate_percent", "value"),
-    State("Public_Debt_percent_of_GDP", "value"),
-    State("Total_Literacy_Rate [%]", "value"),
-    State("Youth_Unemployment_Rate_percent", "value"),
-    State("Expected_Years_of_Schooling_(years)", "value"),
-    State("Human_Development_Index_(value)", "value"),
-    State("Median_Age", "value"),
-    State("Population_Growth_Rate_(percentage)", "value"),
-    State("Life_Expectancy_at_Birth_(years)", "value"),
-    State("Net_Migration_Rate_(per_1,000_population)", "value"),
-    State("internet_penetration_rate", "value"),
-    State("electricity_access_percent", "value"),
-    State("population_density", "value"),
-    State("Arable_Land (%% of Total Agricultural Land)_%", "value")
+    State("filters-store", "data"),
+    *[State(column, "value") for column in FILTER_SLIDERS],
+    prevent_initial_call=True,
 )   
-def apply_reset_filter(
-    activate_clicks,
-    reset_clicks,
-    gdp_per_capita,
-    below_poverty_rate,
-    unemployment_rate,
-    public_debt,
-    literacy_rate,
-    youth_unemployment_rate,
-    exp_year_schooling,
-    hdi,
-    median_age,
-    population_growth,
-    life_expectancy,
-    migration_rate,
-    internet_pen,
-    elec_access,
-    population_density,
-    arable_land_perc
-):
-    
-    if ctx.triggered_id == None:
-        return DEFAULT_FILTERS
+def apply_reset_filter(activate_clicks, reset_clicks, current, *slider_values):
 
     if ctx.triggered_id == "reset-button":
-        return DEFAULT_FILTERS
+        return DEFAULT_FILTERS if current else dash.no_update
     
-    if ctx.triggered_id == "activate_button":
-        return {
-            ...
-        }
-
+    if ctx.triggered_id == "activate-button":
+        ranges = {}
+        for (column, kind), value in zip(FILTER_SLIDERS.items(), slider_values):
+            if value is None:
+                continue
+            ranges[column] = tuple(value) if kind == "range" else (value, None)
 
+        filters = apply_filters(ranges)
+        # same filter as before - leave the store alone so nothing re-renders
+        if filters.get("hash") == (current or {}).get("hash"):
+            return dash.no_update
+        return filters
 
+    return dash.no_update
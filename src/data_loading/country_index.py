@@ -0,0 +1,40 @@
+import pandas as pd
+from src.data_loading.store import get_derived
+
+
+def build_country_index(df: pd.DataFrame) -> dict[str, dict]:
+    """
+    Build an ISO3 keyed index over the dataset.
+
+    Each entry is a small record with the row position in the dataset and
+    the country name, so the country page never has to scan the frame.
+    If a code appears more than once the first row wins.
+
+    @param df: DataFrame with 'ISO3' and 'Country' columns.
+    @return: Dictionary mapping ISO3 code to {"row": int, "Country": str}.
+    """
+    index = {}
+    iso3_codes = df["ISO3"].to_numpy()
+    countries = df["Country"].to_numpy()
+    for pos, (iso3, country) in enumerate(zip(iso3_codes, countries)):
+        if pd.isna(iso3) or iso3 in index:
+            continue
+        index[iso3] = {"row": pos, "Country": country}
+    return index
+
+
+def get_country_index() -> dict[str, dict]:
+    """
+    Shared ISO3 index over the canonical dataset, built on first use.
+    """
+    return get_derived("country_index", build_country_index)
+
+
+def lookup_country(iso3: str) -> dict | None:
+    """
+    Get the record for an ISO3 code.
+
+    @param iso3: ISO3 country code.
+    @return: Record dict or None if the code is unknown.
+    """
+    return get_country_index().get(iso3)
@@ -1,50 +1,88 @@
-from src.data_preprocessing.preprocessing import load_data, load_external_data, clean_country_names, merge_data, clean_demographics_data, clean_economy_data, clean_geography_data, clean_government_data, clean_transportation_data, derive_new_metrics, clean_communications_data
+from src.data_preprocessing.preprocessing import DATA_DIR, EXTERNAL_DATA_DIR, load_data, load_external_data, clean_country_names, merge_data, clean_demographics_data, clean_economy_data, clean_geography_data, clean_government_data, clean_transportation_data, derive_new_metrics, clean_communications_data
+from src.data_preprocessing.dtype_plan import apply_dtype_plan, format_memory_report
+from src.utils.instrumentation import finish_report, report_from_env, run_stage
+import logging
 import pandas as pd
 
-def load_data_into_df():
+logger = logging.getLogger(__name__)
+
+# CIA entries that are not countries (continents, oceans, aggregates)
+NON_COUNTRY_ROWS = [
+    "ANTARCTICA",
+    "ARCTIC OCEAN",
+    "ATLANTIC OCEAN",
+    "PACIFIC OCEAN",
+    "UNITED STATES PACIFIC ISLAND WILDLIFE REFUGES",
+    "WORLD",
+    "EUROPEAN UNION",
+    "TOKELAU"
+]
+
+# per-dataset cleaners, in the order they run
+CLEANERS = [
+    ("geography_data", clean_geography_data),
+    ("government_and_civics_data", clean_government_data),
+    ("transportation_data", clean_transportation_data),
+    ("demographics_data", clean_demographics_data),
+    ("economy_data", clean_economy_data),
+    ("communications_data", clean_communications_data),
+]
+
+def load_data_into_df(data_dir=DATA_DIR, external_dir=EXTERNAL_DATA_DIR, report: dict | None = None):
+    """
+    Run the whole pipeline: read, clean and merge the csvs into one country table.
+
+    Every stage goes through run_stage, so with profiling on (env var, see
+    utils.instrumentation) or a report passed in, their time, CPU,
+    peak allocation and output shape are recorded.
+
+    @param data_dir: Directory with the CIA csvs.
+    @param external_dir: Directory with the external (ISO3 keyed) csvs.
+    @param report: Report from instrumentation.new_report to fill, it is not
+        finished or logged here. By default one is made if the env var is set.
+    @return: Merged DataFrame.
+    """
+    own_report = report is None
+    if own_report:
+        report = report_from_env()
+
     # load fresh copy of raw csvs each time to avoid mutating a shared module-level dict
-    data_dict = load_data()
+    data_dict = load_data(data_dir, report)
 
-    data_dict["geography_data"] = clean_geography_data(data_dict["geography_data"])
-    data_dict["government_and_civics_data"] = clean_government_data(data_dict["government_and_civics_data"])
-    data_dict["transportation_data"] = clean_transportation_data(data_dict["transportation_data"])
-    data_dict["demographics_data"] = clean_demographics_data(data_dict["demographics_data"])
-    data_dict["economy_data"] = clean_economy_data(data_dict["economy_data"])
-    data_dict['communications_data'] = clean_communications_data(data_dict['communications_data'])
+    for key, cleaner in CLEANERS:
+        data_dict[key] = run_stage(report, cleaner.__name__, cleaner, data_dict[key])
 
-    external_data = load_external_data()
-    merged_external = merge_data(external_data, key="ISO3")
+    external_data = load_external_data(external_dir, report)
+    merged_external = run_stage(report, "merge_data external", merge_data, external_data, key="ISO3")
 
-    merged_data = merge_data(data_dict)
+    merged_data = run_stage(report, "merge_data cia", merge_data, data_dict)
 
     ### Removing Continents and Oceans and whatnot - shit is fucking up some data
-    removed_countries = merged_data['Country'].isin([
-        "ANTARCTICA",
-        "ARCTIC OCEAN",
-        "ATLANTIC OCEAN",
-        "PACIFIC OCEAN",
-        "UNITED STATES PACIFIC ISLAND WILDLIFE REFUGES",
-        "WORLD",
-        "EUROPEAN UNION",
-        "TOKELAU"
-    ])
+    removed_countries = merged_data['Country'].isin(NON_COUNTRY_ROWS)
 
     merged_data = merged_data[~removed_countries]
 
 
-    merged_data = clean_country_names(merged_data)
+    merged_data = run_stage(report, "clean_country_names", clean_country_names, merged_data)
     merged_data = merged_data.drop(columns=["Population_Growth_Rate [%]"])
 
-    merged_data = pd.merge(
+    merged_data = run_stage(
+        report, "join external",
+        pd.merge,
         merged_data,
         merged_external,
         how="left",
         left_on="ISO3",
         right_on="ISO3"
     )
-    merged_data = derive_new_metrics(merged_data)
-    for col in merged_data.columns:
-        print(col, " - ", merged_data[col].dtype)
+    merged_data = run_stage(report, "derive_new_metrics", derive_new_metrics, merged_data)
 
-    return merged_data
+    merged_data, memory = run_stage(report, "apply_dtype_plan", apply_dtype_plan, merged_data)
+    logger.debug("dtype plan:\n%s", format_memory_report(memory))
 
+    if report is not None:
+        report["bytes_before"] = int(memory["bytes_before"].sum())
+        report["bytes_after"] = int(memory["bytes_after"].sum())
+    if own_report:
+        finish_report(report)
+    return merged_data
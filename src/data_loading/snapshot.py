@@ -0,0 +1,210 @@
+import hashlib
+import importlib.metadata
+import json
+import os
+import pathlib
+import shutil
+import warnings
+import numpy as np
+import pandas as pd
+from src.utils.cache import CACHE_DIR, PROJECT_ROOT, file_digest
+
+# Binary columnar snapshot of the cleaned, merged dataset.
+# Every column is written as its own .npy file and the dtypes/column order live
+# in a small json sidecar. On read numeric, nullable and categorical columns stay
+# backed by the memory-mapped files (read-only), only string/object columns are
+# rebuilt in memory. The snapshot is keyed by a
+# hash of all input csvs plus the pipeline code, so editing a csv or a cleaner
+# makes the key change and the next start rebuilds from raw data.
+
+SNAPSHOT_FORMAT = 1
+
+DATA_DIRS = [PROJECT_ROOT / "data", PROJECT_ROOT / "external_data"]
+PIPELINE_SOURCES = [
+    *sorted((PROJECT_ROOT / "src" / "data_preprocessing").glob("*.py")),
+    PROJECT_ROOT / "src" / "data_loading" / "load_data.py",
+]
+
+
+def _package_version(name: str) -> str:
+    try:
+        return importlib.metadata.version(name)
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def dataset_key() -> str:
+    """
+    Hash identifying the current dataset build.
+
+    Covers every file in data/ and external_data/, the source of the pipeline
+    modules, the pycountry version (used for name matching) and the snapshot format.
+
+    @return: Hex digest string.
+    """
+    h = hashlib.sha256()
+    h.update(f"format={SNAPSHOT_FORMAT};pycountry={_package_version('pycountry')}".encode())
+
+    inputs = [f for d in DATA_DIRS for f in sorted(d.glob("*")) if f.is_file()]
+    for path in inputs + PIPELINE_SOURCES:
+        h.update(str(path.relative_to(PROJECT_ROOT)).encode())
+        h.update(file_digest(path).encode())
+
+    return h.hexdigest()
+
+
+def _snapshot_dir(key: str) -> pathlib.Path:
+    return CACHE_DIR / f"dataset-{key[:32]}"
+
+
+#region column codecs
+def _encode_column(series: pd.Series, stem: str, out_dir: pathlib.Path) -> dict:
+    """
+    Write one column to out_dir and return its sidecar entry.
+    Raises TypeError for columns we don't know how to store.
+    """
+    entry = {"name": series.name, "dtype": str(series.dtype)}
+    dtype = series.dtype
+
+    if isinstance(dtype, pd.CategoricalDtype):
+        entry["kind"] = "category"
+        entry["categories"] = dtype.categories.tolist()
+        entry["ordered"] = bool(dtype.ordered)
+        np.save(out_dir / f"{stem}.npy", series.cat.codes.to_numpy())
+        return entry
+
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        # pandas nullable numeric (Float64, Int64, boolean) - values + mask
+        if not hasattr(series.array, "_mask"):
+            raise TypeError(f"unsupported extension dtype {dtype} in column {series.name!r}")
+        entry["kind"] = "masked"
+        np.save(out_dir / f"{stem}.npy", series.array._data)
+        np.save(out_dir / f"{stem}.mask.npy", series.array._mask)
+        return entry
+
+    if dtype != object:
+        entry["kind"] = "numpy"
+        np.save(out_dir / f"{stem}.npy", series.to_numpy())
+        return entry
+
+    # object columns: either all strings or all numbers (plus missing values)
+    mask = series.isna().to_numpy()
+    values = series.to_numpy()[~mask]
+    if all(isinstance(v, str) for v in values):
+        entry["kind"] = "string"
+        filled = np.where(mask, "", series.to_numpy()).astype(str)
+    elif all(isinstance(v, (int, float, np.number)) and not isinstance(v, bool) for v in values):
+        entry["kind"] = "object-number"
+        filled = np.where(mask, np.nan, series.to_numpy()).astype(np.float64)
+    else:
+        raise TypeError(f"mixed object column {series.name!r} can not be snapshotted")
+
+    np.save(out_dir / f"{stem}.npy", filled)
+    np.save(out_dir / f"{stem}.mask.npy", mask)
+    return entry
+
+
+def _decode_column(entry: dict, stem: str, in_dir: pathlib.Path):
+    values = np.load(in_dir / f"{stem}.npy", mmap_mode="r")
+    kind = entry["kind"]
+
+    if kind == "numpy":
+        return values
+
+    if kind == "category":
+        dtype = pd.CategoricalDtype(entry["categories"], ordered=entry["ordered"])
+        return pd.Categorical.from_codes(np.asarray(values), dtype=dtype)
+
+    mask = np.load(in_dir / f"{stem}.mask.npy", mmap_mode="r")
+
+    if kind == "masked":
+        array_type = pd.api.types.pandas_dtype(entry["dtype"]).construct_array_type()
+        return array_type(values, mask)
+
+    # string / object-number: back to an object column with NaN for missing
+    out = np.asarray(values).astype(object)
+    out[np.asarray(mask)] = np.nan
+    return out
+#endregion
+
+
+def write_snapshot(df: pd.DataFrame, key: str) -> pathlib.Path | None:
+    """
+    Write df as a columnar snapshot under CACHE_DIR, replacing older snapshots.
+
+    Failures (read-only disk, unsupported column) only emit a warning, the app
+    keeps running on the freshly built frame.
+
+    @param df: Frame to store, must have a default RangeIndex.
+    @param key: Dataset key from dataset_key().
+    @return: Snapshot directory or None if nothing was written.
+    """
+    target = _snapshot_dir(key)
+    tmp = target.with_name(f"{target.name}.tmp-{os.getpid()}")
+    try:
+        if not df.index.equals(pd.RangeIndex(len(df))):
+            raise TypeError("only frames with a default RangeIndex can be snapshotted")
+        if not df.columns.is_unique:
+            raise TypeError("column names must be unique")
+
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+
+        columns = [
+            _encode_column(df.iloc[:, i], f"{i:04d}", tmp)
+            for i in range(df.shape[1])
+        ]
+        meta = {
+            "format": SNAPSHOT_FORMAT,
+            "key": key,
+            "rows": len(df),
+            "pandas": pd.__version__,
+            "columns": columns,
+        }
+        with open(tmp / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+        if target.exists():
+            # another worker got there first, keep theirs
+            shutil.rmtree(tmp, ignore_errors=True)
+        else:
+            os.replace(tmp, target)
+    except (OSError, TypeError) as e:
+        shutil.rmtree(tmp, ignore_errors=True)
+        warnings.warn(f"could not write dataset snapshot: {e}")
+        return None
+
+    # drop snapshots for older keys
+    for old in CACHE_DIR.glob("dataset-*"):
+        if old != target and ".tmp-" not in old.name:
+            shutil.rmtree(old, ignore_errors=True)
+
+    return target
+
+
+def read_snapshot(key: str) -> pd.DataFrame | None:
+    """
+    Load the snapshot for key, if there is one.
+
+    @param key: Dataset key from dataset_key().
+    @return: DataFrame or None when no valid snapshot exists for this key.
+    """
+    in_dir = _snapshot_dir(key)
+    try:
+        with open(in_dir / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != SNAPSHOT_FORMAT or meta.get("key") != key:
+            return None
+
+        data = {
+            entry["name"]: _decode_column(entry, f"{i:04d}", in_dir)
+            for i, entry in enumerate(meta["columns"])
+        }
+    except (OSError, ValueError, KeyError):
+        return None
+
+    # copy=False keeps every column in its own block, backed by the memory map
+    df = pd.DataFrame(data, copy=False)
+    if len(df) != meta["rows"]:
+        return None
+    return df
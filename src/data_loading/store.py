@@ -0,0 +1,95 @@
+import threading
+import pandas as pd
+from src.data_loading.load_data import load_data_into_df
+from src.data_loading.snapshot import dataset_key, read_snapshot, write_snapshot
+
+# One canonical copy of the merged dataset per process.
+# Pages and components read from here instead of running the pipeline themselves,
+# so the frame is built once at startup and shared by every callback.
+# Treat the returned frame as read-only - copy before mutating.
+
+_lock = threading.RLock()
+_dataset = None
+_version = None
+_derived = {}
+# marks a missing artifact (an artifact may be None)
+_MISSING = object()
+
+
+def _load_dataset() -> tuple[pd.DataFrame, str]:
+    """
+    Load the dataset from the on-disk snapshot, or run the pipeline and
+    write a new snapshot when the inputs changed.
+    """
+    key = dataset_key()
+    df = read_snapshot(key)
+    if df is None:
+        df = load_data_into_df()
+        write_snapshot(df, key)
+    return df, key[:16]
+
+
+def get_dataset() -> pd.DataFrame:
+    """
+    Return the canonical merged dataset, building it on first use.
+
+    Safe to call from multiple threads (flask's threaded dev server), the
+    pipeline only runs once even if several requests race on a cold start.
+
+    @return: Shared DataFrame with the cleaned, merged country data.
+    """
+    global _dataset, _version
+    if _dataset is None:
+        with _lock:
+            # another thread may have finished the build while we waited
+            if _dataset is None:
+                _dataset, _version = _load_dataset()
+    return _dataset
+
+
+def get_dataset_version() -> str:
+    """
+    Short identifier of the loaded dataset (prefix of the snapshot key).
+    Changes whenever an input csv or the pipeline code changes, so it can be
+    used as part of cache keys for anything computed from the dataset.
+    """
+    get_dataset()
+    return _version
+
+
+def get_derived(name: str, builder):
+    """
+    Return an artifact computed from the canonical dataset, building it once.
+
+    Used for indexes and lookup tables that are derived from the dataset and
+    should be shared by every request instead of being recomputed.
+
+    @param name: Unique name of the artifact.
+    @param builder: Function taking the dataset and returning the artifact.
+    @return: The cached artifact.
+    """
+    artifact = _derived.get(name, _MISSING)
+    if artifact is _MISSING:
+        with _lock:
+            # built from the dataset current under the lock, so use_dataset
+            # can't swap it (and clear _derived) in between
+            artifact = _derived.get(name, _MISSING)
+            if artifact is _MISSING:
+                artifact = _derived[name] = builder(get_dataset())
+    return artifact
+
+
+def use_dataset(df: pd.DataFrame, version: str):
+    """
+    Replace the canonical dataset, e.g. with a synthetic one in benchmarks.
+    Derived artifacts are dropped; caches keyed by the dataset version
+    rebuild on their own. Call before the pages are imported, they keep a
+    reference to the frame.
+
+    @param df: Dataset in the same format as the pipeline output.
+    @param version: Version string for cache keys, must differ from the real one.
+    """
+    global _dataset, _version
+    with _lock:
+        _dataset, _version = df, version
+        _derived.clear()
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+# Compact dtypes for the final merged frame.
+# - every numeric column ends up as plain numpy floats with NaN for missing
+#   (no pandas nullable Float64 mixed in)
+# - float32 where it does not lose information, float64 otherwise
+# - low cardinality text columns become categoricals
+
+# largest integer float32 can store exactly
+FLOAT32_EXACT_INT = 2**24
+# max relative error accepted when narrowing non-integer columns to float32
+FLOAT32_RTOL = 1e-6
+# text columns with at most this share of distinct values become categoricals
+CATEGORY_MAX_RATIO = 0.5
+
+
+def _fits_float32(values: np.ndarray) -> bool:
+    """
+    True if a float64 array can be stored as float32 without losing information:
+    whole numbers must stay exact, other values within FLOAT32_RTOL.
+    """
+    finite = values[np.isfinite(values)]
+    if finite.size == 0:
+        return True
+    if np.abs(finite).max() > np.finfo(np.float32).max:
+        return False
+
+    if np.all(finite == np.round(finite)):
+        return np.abs(finite).max() <= FLOAT32_EXACT_INT
+
+    narrowed = finite.astype(np.float32).astype(np.float64)
+    return bool(np.allclose(narrowed, finite, rtol=FLOAT32_RTOL, atol=0))
+
+
+def _plan_column(series: pd.Series) -> str | None:
+    """
+    Target dtype for one column, or None to leave it as is.
+    """
+    dtype = series.dtype
+
+    if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(dtype):
+        return None
+
+    if pd.api.types.is_numeric_dtype(dtype):
+        values = series.to_numpy(dtype="float64", na_value=np.nan)
+        return "float32" if _fits_float32(values) else "float64"
+
+    if dtype == object:
+        non_null = series.dropna()
+        if non_null.empty:
+            return None
+        if all(isinstance(v, (int, float, np.number)) and not isinstance(v, bool) for v in non_null):
+            values = non_null.to_numpy(dtype="float64")
+            return "float32" if _fits_float32(values) else "float64"
+        if non_null.nunique() <= CATEGORY_MAX_RATIO * len(non_null):
+            return "category"
+
+    return None
+
+
+def apply_dtype_plan(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Convert df to compact dtypes.
+
+    @param df: Merged country DataFrame.
+    @return: Tuple of (converted DataFrame, per column memory report from memory_report).
+    """
+    out = df.copy()
+    for col in df.columns:
+        target = _plan_column(df[col])
+        if target is None or str(df[col].dtype) == target:
+            continue
+        if target == "category":
+            out[col] = df[col].astype("category")
+        else:
+            # nullable / object numbers -> plain numpy floats with NaN
+            out[col] = df[col].to_numpy(dtype="float64", na_value=np.nan).astype(target)
+
+    return out, memory_report(df, out)
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per column dtype and memory use before and after a conversion.
+
+    @return: DataFrame indexed by column with dtype_before, dtype_after,
+        bytes_before, bytes_after and saved_bytes.
+    """
+    report = pd.DataFrame({
+        "dtype_before": before.dtypes.astype(str),
+        "dtype_after": after.dtypes.astype(str),
+        "bytes_before": before.memory_usage(deep=True, index=False),
+        "bytes_after": after.memory_usage(deep=True, index=False),
+    })
+    report["saved_bytes"] = report["bytes_before"] - report["bytes_after"]
+    return report
+
+
+def format_memory_report(report: pd.DataFrame) -> str:
+    """
+    Human readable version of memory_report for logs.
+    """
+    lines = [
+        f"{col}  -  {row.dtype_before} -> {row.dtype_after}  ({row.bytes_before:,} -> {row.bytes_after:,} bytes)"
+        for col, row in report.iterrows()
+    ]
+    total_before = report["bytes_before"].sum()
+    total_after = report["bytes_after"].sum()
+    lines.append(f"total: {total_before:,} -> {total_after:,} bytes ({1 - total_after / max(total_before, 1):.0%} saved)")
+    return "\n".join(lines)
@@ -1,9 +1,18 @@
 
 import pycountry
 import csv
+import functools
+import hashlib
+import importlib.metadata
+import json
+import os
+import warnings
 from collections import OrderedDict
-from thefuzz import process
+from rapidfuzz import fuzz, process as rf_process
+from rapidfuzz.utils import default_process
+import numpy as np
 import pathlib
+from src.utils.cache import CACHE_DIR, file_digest
 
 ## Manual overrides for countries with historic or alternate names
 manual_name_map = {
@@ -36,35 +45,123 @@ manual_name_map = {
     # Add more known alias mappings as needed
 }
 
-# Extract country names from CSV
+# thefuzz strips latin-1 characters before scoring, keep the same behaviour
+# so batched matches are identical to process.extractOne
+_ASCII_ONLY = {i: None for i in range(128, 256)}
+
+def _match_process(s) -> str:
+    return default_process(str(s).translate(_ASCII_ONLY))
+
+
+def best_matches(queries: list[str], choices: list[str]) -> tuple[list[str], list[int]]:
+    """
+    Fuzzy match every query against choices in one batched call.
+
+    Same scorer (WRatio), preprocessing, tie-breaking (first best choice wins)
+    and integer rounding as thefuzz's process.extractOne, but all pairs are
+    scored at once with rapidfuzz's cdist on all cores.
+
+    @param queries: Names to match.
+    @param choices: Candidate names.
+    @return: Tuple of (best matching choice, rounded score) lists, aligned with queries.
+    """
+    if len(queries) == 0 or len(choices) == 0:
+        return [None] * len(queries), [0] * len(queries)
+
+    scores = rf_process.cdist(
+        queries, choices,
+        scorer=fuzz.WRatio,
+        processor=_match_process,
+        workers=-1,
+    )
+    best = scores.argmax(axis=1)
+    best_scores = scores[np.arange(len(queries)), best]
+    return [choices[i] for i in best], [int(round(float(x))) for x in best_scores]
+
 filename = pathlib.Path(__file__).parent.parent.parent/'data'/'economy_data.csv'
-country_names = []
-with open(filename, encoding='utf-8') as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        country = row['Country'].strip()
-        if country and country not in country_names:
-            country_names.append(country)
-
-country_names_pycountry = []
-for c in pycountry.countries:
-    country_names_pycountry.append(c.name)
-    """ if hasattr(c, 'official_name'):
-        country_names_pycountry.append(c.official_name)
-    if hasattr(c, 'common_name'):
-        country_names_pycountry.append(c.common_name) """
-country_names_pycountry = list(set(country_names_pycountry))
-
-country_map = OrderedDict()
-for name in country_names:
-    # Check manual override first
-    if name.upper() in manual_name_map:
-        country_map[name] = manual_name_map[name.upper()]
-        continue
-    best_match, score = process.extractOne(name, country_names_pycountry)
-    if score >= 80:
-        country_map[name] = best_match
-    else:
-        country_map[name] = None
-
-#print(country_map)
\ No newline at end of file
+MATCH_THRESHOLD = 80
+ALIAS_CACHE_FORMAT = 1
+
+
+def _alias_cache_path() -> pathlib.Path:
+    """
+    Cache file for the alias map. The name hashes everything the map depends on:
+    pycountry version, the source csv, manual_name_map and the match threshold.
+    """
+    h = hashlib.sha256()
+    h.update(f"format={ALIAS_CACHE_FORMAT};threshold={MATCH_THRESHOLD}".encode())
+    h.update(importlib.metadata.version("pycountry").encode())
+    h.update(file_digest(filename).encode())
+    h.update(json.dumps(manual_name_map, sort_keys=True).encode())
+    return CACHE_DIR / f"country_map-{h.hexdigest()[:32]}.json"
+
+
+def build_country_map() -> OrderedDict:
+    """
+    Map every country name in economy_data.csv to a pycountry name (or None).
+    Manual overrides win, everything else is fuzzy matched in one batch.
+    """
+    # Extract country names from CSV, dict keeps first-seen order while deduplicating
+    country_names = {}
+    with open(filename, encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            country = row['Country'].strip()
+            if country:
+                country_names[country] = None
+
+    country_names_pycountry = sorted({c.name for c in pycountry.countries})
+
+    to_match = [name for name in country_names if name.upper() not in manual_name_map]
+    matches, scores = best_matches(to_match, country_names_pycountry)
+    fuzzy = {
+        name: match if score >= MATCH_THRESHOLD else None
+        for name, match, score in zip(to_match, matches, scores)
+    }
+
+    country_map = OrderedDict()
+    for name in country_names:
+        # Check manual override first
+        if name.upper() in manual_name_map:
+            country_map[name] = manual_name_map[name.upper()]
+        else:
+            country_map[name] = fuzzy[name]
+    return country_map
+
+
+@functools.lru_cache(maxsize=1)
+def get_country_map() -> OrderedDict:
+    """
+    Alias map from CIA country names to pycountry names, built on first use.
+    The result is kept in a small json file under the cache dir, so later
+    processes only read it back instead of fuzzy matching again.
+
+    @return: OrderedDict of csv name -> pycountry name or None.
+    """
+    path = _alias_cache_path()
+    try:
+        with open(path, encoding='utf-8') as f:
+            return OrderedDict(json.load(f))
+    except (OSError, ValueError):
+        pass
+
+    country_map = build_country_map()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".tmp-{os.getpid()}")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(list(country_map.items()), f)
+        os.replace(tmp, path)
+        for old in CACHE_DIR.glob("country_map-*.json"):
+            if old != path:
+                old.unlink(missing_ok=True)
+    except OSError as e:
+        warnings.warn(f"could not write country alias cache: {e}")
+    return country_map
+
+
+def __getattr__(name):
+    # keep `from mappings import country_map` working without building at import
+    if name == "country_map":
+        return get_country_map()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
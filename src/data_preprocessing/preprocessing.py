@@ -1,25 +1,43 @@
+import logging
 import pathlib
 import pandas as pd
-from thefuzz import process
 import pycountry
-from src.data_preprocessing.mappings import country_map
+from src.data_preprocessing.mappings import get_country_map, best_matches
 from src.data_preprocessing.regions import add_region_column
+from src.data_preprocessing.schema import apply_schema, GEOGRAPHY_SCHEMA, TRANSPORTATION_SCHEMA
+from src.utils.instrumentation import run_stage
 import re
 import numpy as np
 from dateutil.parser import parse
 # Manual mappings for country names that do not match pycountry entries
 
+logger = logging.getLogger(__name__)
+
 # Precompute list of country names for fuzzy matching
 country_list = []
 for c in pycountry.countries:
     country_list.append(c.name)
 
+# exact pycountry name -> ISO3, checked before any fuzzy matching
+iso3_by_name = {c.name: c.alpha_3 for c in pycountry.countries}
+
+# territories reported separately by the CIA but merged into one country
+MERGED_TERRITORIES = {
+    "Gaza Strip": "Palestine, State of",
+    "West Bank": "Palestine, State of",
+}
+
+# shipped CIA csvs and the external (ISO3 keyed) csvs
+DATA_DIR = pathlib.Path(__file__).parent.parent.parent/'data'
+EXTERNAL_DATA_DIR = pathlib.Path(__file__).parent.parent.parent/'external_data'
+
 #Load all CSV files from the data directory into a dictionary of DataFrames
-def load_data(directory_path =  pathlib.Path(__file__).parent.parent.parent/'data') -> dict[str, pd.DataFrame]:
+def load_data(directory_path = DATA_DIR, report: dict | None = None) -> dict[str, pd.DataFrame]:
     """
     Load all CSV files from the data directory into a dictionary of DataFrames.
 
     @param directory_path: Path to the directory containing CSV files.
+    @param report: Pipeline profile to record every file read in (see utils.instrumentation).
     @return: Dictionary where keys are file names (without .csv) and values are Data
     """
     data_dict = {}
@@ -27,7 +45,7 @@ def load_data(directory_path =  pathlib.Path(__file__).parent.parent.parent/'dat
     for file in directory_path.glob('*.csv'):
         key = file.stem
         path_to_file = directory_path / file.name
-        df = pd.read_csv(path_to_file)
+        df = run_stage(report, f"read_csv {directory_path.name}/{file.name}", pd.read_csv, path_to_file)
         data_dict[key] = df
 
 
@@ -36,18 +54,19 @@ def load_data(directory_path =  pathlib.Path(__file__).parent.parent.parent/'dat
 
 
 
-def load_external_data() -> dict[str, pd.DataFrame]:
+def load_external_data(directory_path = EXTERNAL_DATA_DIR, report: dict | None = None) -> dict[str, pd.DataFrame]:
     """
     Loads external data that we incorporated (so not the cia one) into a dict of DataFrames.
 
+    @param directory_path: Path to the directory containing the external CSV files.
+    @param report: Pipeline profile to record every file read in.
     @return DataFrame containing the data from the CSV file.
     """
     data_dict = dict()
-    directory_path = pathlib.Path(__file__).parent.parent.parent/'external_data'
     for file in directory_path.glob('*.csv'):
         key = file.stem
         path_to_file = directory_path / file.name
-        df = pd.read_csv(path_to_file)
+        df = run_stage(report, f"read_csv {directory_path.name}/{file.name}", pd.read_csv, path_to_file)
         data_dict[key] = df
 
     return data_dict
@@ -56,103 +75,44 @@ def load_external_data() -> dict[str, pd.DataFrame]:
 #region Cleaning functions for specific datasets
 
 #region helpers for cleaning geo data
-def _dms_to_decimal(deg: float, minutes: float, hemi: str) -> float:
-    """convert degrees + minutes + hemisphere to signed decimal degrees."""
-    sign = -1 if hemi.upper() in ("S", "W") else 1
-    return sign * (float(deg) + float(minutes) / 60.0)
+# one coordinate is 'deg [min [sec...]] hemisphere', a column value is two of them
+# separated by a single comma (each half parsed on its own)
+_COORD_PATTERN = re.compile(r"^\s*(\S+)(?:\s+(\S+)(?:\s+\S+)*)?\s+(\S+)\s*$")
 
 
-def _parse_one_coord(token: str):
+def _coord_to_decimal(deg: pd.Series, minutes: pd.Series, hemi: pd.Series) -> np.ndarray:
     """
-    Parse a single coordinate like '34 00 N'
-    Returns decimal degrees or pd.NA on failure
+    Signed decimal degrees from extracted degree / minute / hemisphere columns.
+    Missing minutes count as 0, unparsable numbers give NaN.
     """
-    if pd.isna(token):
-        return pd.NA
-
-    bits = str(token).strip().replace("°", "").split()
-    if len(bits) < 2:
-        return pd.NA
-
-    hemi = bits[-1].upper()
-    nums = bits[:-1]
-
-    try:
-        if len(nums) == 2:
-            deg, minutes = nums
-        elif len(nums) == 1:
-            deg, minutes = nums[0], 0
-        else:
-            #sometimes we might get deg, min, sec. just ignore sec?
-            deg, minutes = nums[0], nums[1]
+    deg_num = pd.to_numeric(deg, errors="coerce").to_numpy(dtype="float64")
+    min_num = pd.to_numeric(minutes, errors="coerce").to_numpy(dtype="float64")
+    min_num = np.where(minutes.isna().to_numpy(), 0.0, min_num)
 
-        return _dms_to_decimal(float(deg), float(minutes), hemi)
-    except (ValueError, TypeError):
-        return pd.NA
+    sign = np.where(hemi.str.upper().isin(["S", "W"]).to_numpy(), -1.0, 1.0)
+    return sign * (deg_num + min_num / 60.0)
 
 
-def _parse_geographic_coordinates(s: str):
+def _parse_coordinate_column(coords: pd.Series) -> tuple[np.ndarray, np.ndarray]:
     """
-    Make '34 00 N, 62 00 E' to (lat_dd, lon_dd).
-    Returns (pd.NA, pd.NA) on failure.
-    """
-    if pd.isna(s):
-        return pd.NA, pd.NA
-
-    parts = [p.strip() for p in str(s).split(",")]
-    if len(parts) != 2:
-        return pd.NA, pd.NA
-
-    lat_token, lon_token = parts
-    lat = _parse_one_coord(lat_token)
-    lon = _parse_one_coord(lon_token)
-    return lat, lon
-
+    Parse a whole column like '34 00 N, 62 00 E' into latitude / longitude arrays.
+    Seconds are ignored. Values without exactly one comma give NaN for both;
+    otherwise a malformed half (missing hemisphere, non numeric degrees) gives
+    NaN for that coordinate only.
 
-def _parse_km_value(value):
+    @param coords: Series of coordinate strings.
+    @return: Tuple of float64 arrays (latitude, longitude) aligned with coords.
     """
-    Parse strings like '652,230 sq km', '5,987 km', '14.2 million sq km'
-    into a numeric value in km or sq km (we don't know which; caller
-    knows from context)
-    """
-    if pd.isna(value):
-        return pd.NA
-
-    s = str(value).strip().lower()
-    if s in ("", "na", "n/a", "-", "none"):
-        return pd.NA
-
-    factor = 1.0
-    if "million" in s:
-        factor = 1_000_000.0
-
-    #keep only digits, minus, and decimal point
-    num_str = re.sub(r"[^0-9\.\-]", "", s)
-    if num_str == "":
-        return pd.NA
+    text = coords.where(coords.isna(), coords.astype(str)).astype(object)
+    text = text.str.replace("°", "", regex=False)
+    # anything but a single comma fails the whole value
+    halves = text.str.extract(r"^([^,]*),([^,]*)$")
 
-    try:
-        return float(num_str) * factor
-    except ValueError:
-        return pd.NA
-
-
-def _parse_percent_value(value):
-    """
-    Parse '12.3%' to 12.3
-    """
-    if pd.isna(value):
-        return pd.NA
-
-    s = str(value).strip()
-    if s in ("", "na", "n/a", "-", "none"):
-        return pd.NA
-
-    s = s.replace("%", "").replace(",", "")
-    try:
-        return float(s)
-    except ValueError:
-        return pd.NA
+    lat_parts = halves[0].str.extract(_COORD_PATTERN)
+    lon_parts = halves[1].str.extract(_COORD_PATTERN)
+    lat = _coord_to_decimal(lat_parts[0], lat_parts[1], lat_parts[2])
+    lon = _coord_to_decimal(lon_parts[0], lon_parts[1], lon_parts[2])
+    return lat, lon
 #endregion
 
 def clean_geography_data(geography_df: pd.DataFrame) -> pd.DataFrame:
@@ -160,51 +120,25 @@ def clean_geography_data(geography_df: pd.DataFrame) -> pd.DataFrame:
     Clean the geography_data.csv df
 
     - split Geographic_Coordinates into numeric Latitude / Longitude
-    - convert all 'sq km' and 'km' columns to numeric and append '_sq_km' / '_km' to names
-    - convert all percentage columns to numeric and append '_%' to names.
+    - convert the 'sq km', 'km' and '%' columns listed in GEOGRAPHY_SCHEMA to numeric
+      and append '_sq_km' / '_km' / '_%' to names
     - not doing anything about missing values
     """
-    df = geography_df.copy()
+    df = apply_schema(geography_df, GEOGRAPHY_SCHEMA, "geography_data")
 
     # Geographic coordinates to Latitude / Longitude columns
     coord_col_candidates = [c for c in df.columns if "coord" in c.lower()]
     if coord_col_candidates:
         coord_col = coord_col_candidates[0]
-        lats, lons = zip(*df[coord_col].apply(_parse_geographic_coordinates))
-        df["Latitude"] = pd.to_numeric(pd.Series(lats), errors="coerce")
-        df["Longitude"] = pd.to_numeric(pd.Series(lons), errors="coerce")
+        df["Latitude"], df["Longitude"] = _parse_coordinate_column(df[coord_col])
         # keep original coord column for reference mby?
 
-    # Detect km / sq km / % columns and transform
-    for col in list(df.columns):
-        if not pd.api.types.is_object_dtype(df[col]):
-            continue
-
-        sample_values = df[col].dropna().astype(str).head(30).str.lower().tolist()
-        sample_text = " ".join(sample_values)
-
-        #% columns
-        if "%" in sample_text:
-            new_col_name = f"{col}_%"
-            df[new_col_name] = df[col].apply(_parse_percent_value)
-            df.drop(columns=[col], inplace=True)
-            continue
-
-        #sq km columns
-        if "sq km" in sample_text:
-            new_col_name = f"{col}_sq_km"
-            df[new_col_name] = df[col].apply(_parse_km_value)
-            df.drop(columns=[col], inplace=True)
-            continue
-
-        #km columns (not sq km)
-        if " km" in sample_text or sample_text.endswith("km"):
-            new_col_name = f"{col}_km"
-            df[new_col_name] = df[col].apply(_parse_km_value)
-            df.drop(columns=[col], inplace=True)
-            continue
-    
-    df['Agricultural_Land_%'] = pd.to_numeric(df['Agricultural_Land_%'], errors='coerce')
+        # same column order as before the schema: untouched columns, the
+        # coordinates, then the converted unit columns
+        untouched = [c for c in geography_df.columns if c in df.columns]
+        coords = ["Latitude", "Longitude"]
+        df = df[untouched + coords + [c for c in df.columns if c not in untouched and c not in coords]]
+
     return df
 
 def clean_government_data(gov_df: pd.DataFrame) -> pd.DataFrame:
@@ -219,53 +153,17 @@ def clean_government_data(gov_df: pd.DataFrame) -> pd.DataFrame:
     if coord_cols:
         coord_col = coord_cols[0]
 
-        lats, lons = zip(*df[coord_col].apply(_parse_geographic_coordinates))
-        df["Capital_Latitude"] = pd.to_numeric(pd.Series(lats), errors="coerce")
-        df["Capital_Longitude"] = pd.to_numeric(pd.Series(lons), errors="coerce")
+        df["Capital_Latitude"], df["Capital_Longitude"] = _parse_coordinate_column(df[coord_col])
 
     return df
 
-#region helpers for cleaning transportation data
-def _parse_numeric(value):
-    """
-    Convert values like '58,000', '  1200 ', '-', '' to numeric or NaN.
-    """
-    if pd.isna(value):
-        return np.nan
-    
-    s = str(value).strip().lower()
-    if s in ("", "na", "n/a", "-", "none", "null"):
-        return np.nan
-    
-    # Remove commas, spaces, and other non-numeric characters
-    s = re.sub(r"[^0-9\.\-]", "", s)
-    if s == "":
-        return np.nan
-
-    try:
-        return float(s)
-    except ValueError:
-        return np.nan
-#endregion
-
 def clean_transportation_data(df: pd.DataFrame) -> pd.DataFrame:
     """
     Clean transportation_data.csv.
-    - Convert all numeric columns to float
+    - Convert all numeric columns (see TRANSPORTATION_SCHEMA) to pandas nullable Float64
     - Replace missing numerical values with NaN
     """
-    clean_df = df.copy()
-
-    numeric_columns = [
-        col for col in clean_df.columns 
-        if col.lower() != "country"
-    ]
-
-    for col in numeric_columns:
-        clean_df[col] = clean_df[col].apply(_parse_numeric)
-        clean_df[col] = clean_df[col].astype("Float64")  #pandas nullable float
-
-    return clean_df
+    return apply_schema(df, TRANSPORTATION_SCHEMA, "transportation_data")
 
 def _fiscal_year_to_md(fy_string):
     """
@@ -293,6 +191,28 @@ def _fiscal_year_to_md(fy_string):
 
     return None, None
 
+
+def _parse_fiscal_years(fiscal_years: pd.Series) -> tuple[pd.Categorical, pd.Categorical]:
+    """
+    Run _fiscal_year_to_md once per distinct fiscal year string and broadcast
+    the results back to every row.
+    The column only has a handful of distinct values ('calendar year',
+    '1 July - 30 June', ...), so this avoids calling dateutil for every row.
+
+    @param fiscal_years: Series of raw fiscal year strings.
+    @return: Tuple of categoricals (start month-day, end month-day) like '01-01'.
+    """
+    codes, uniques = pd.factorize(fiscal_years)
+    parsed = [_fiscal_year_to_md(fy) for fy in uniques]
+
+    result = []
+    for i in range(2):
+        per_unique = pd.Categorical([p[i] for p in parsed])
+        # factorize gives -1 for missing fiscal years, the appended -1 keeps those missing
+        row_codes = np.append(per_unique.codes, -1)[codes]
+        result.append(pd.Categorical.from_codes(row_codes, categories=per_unique.categories))
+    return result[0], result[1]
+
 #endregion
 
 def clean_economy_data(df_economy:pd.DataFrame) -> pd.DataFrame:
@@ -300,8 +220,8 @@ def clean_economy_data(df_economy:pd.DataFrame) -> pd.DataFrame:
     if "Fiscal_Year" not in df_economy.columns:
         return df_economy
 
-    df_economy["Fiscal_Year_Start_Date"], df_economy["Fiscal_Year_End_Date"] = zip(
-    *df_economy["Fiscal_Year"].apply(_fiscal_year_to_md))
+    df_economy["Fiscal_Year_Start_Date"], df_economy["Fiscal_Year_End_Date"] = _parse_fiscal_years(
+        df_economy["Fiscal_Year"])
 
     df_economy = df_economy.drop(columns=['Fiscal_Year'])
 
@@ -362,16 +282,46 @@ def merge_data(data_dict: dict[str, pd.DataFrame], key='Country') -> pd.DataFram
     """
     Merge multiple DataFrames in the data dictionary on a common key.
 
+    Every frame is indexed on the key once and all of them are aligned in a
+    single outer concat, instead of folding pairwise outer merges (which
+    builds k-1 intermediate frames). Rows come out sorted by key, like an
+    outer merge.
+
+    Raises ValueError if a frame has duplicate keys, since those would blow
+    up into a cartesian product. Non-key columns that appear in more than one
+    frame get the dataset name appended (e.g. 'Col_economy_data').
+
     @param data_dict: Dictionary of DataFrames to merge.
     @param key: Column name to merge on.
     @return: Merged DataFrame.
     """
-    merged_df = None
-    for df in data_dict.values():
-        if merged_df is None:
-            merged_df = df
-        else:
-            merged_df = pd.merge(merged_df, df, on=key, how='outer')
+    if not data_dict:
+        raise ValueError("merge_data needs at least one DataFrame")
+
+    column_owner = {}
+    indexed = []
+    for name, df in data_dict.items():
+        duplicates = df[key][df[key].duplicated()]
+        if not duplicates.empty:
+            raise ValueError(f"{name}: duplicate {key} values {duplicates.unique().tolist()[:10]}")
+
+        # shallow copy + in-place set_index so the data blocks are not copied
+        df = df.copy(deep=False)
+        df.set_index(key, inplace=True)
+        clashes = [col for col in df.columns if col in column_owner]
+        if clashes:
+            df.columns = [f"{col}_{name}" if col in clashes else col for col in df.columns]
+        for col in df.columns:
+            column_owner[col] = name
+        indexed.append(df)
+
+    merged_df = pd.concat(indexed, axis=1, join='outer', sort=True, copy=False)
+    if not merged_df.index.is_monotonic_increasing:
+        merged_df = merged_df.sort_index()
+
+    # move the key back into a column without copying the data blocks again
+    merged_df.insert(0, key, merged_df.index.to_numpy())
+    merged_df.index = pd.RangeIndex(len(merged_df))
     return merged_df
 
 
@@ -387,10 +337,52 @@ def get_value(df, row, col):
     return df.iloc[row, col]
 
 
+def resolve_ISO3(names: pd.Series, country_list: list=country_list, threshold: int=88) -> tuple[pd.Series, pd.DataFrame]:
+    """
+    Get ISO3 codes for a whole column of country names.
+
+    Names that already are pycountry names are resolved with a dict lookup.
+    Only the remaining distinct names are fuzzy matched, all in one batch.
+
+    @param names: Series of country names.
+    @param country_list: Candidate pycountry names for fuzzy matching.
+    @param threshold: Minimum fuzzy score to accept a match.
+    @return: Tuple of (Series of ISO3 codes or None aligned with names,
+        DataFrame with the names that went through fuzzy matching, their
+        best match, score and resulting code).
+    """
+    stripped = {name: str(name).strip() for name in names.dropna().unique()}
+    resolved = {}
+    leftovers = []
+    for name, clean in stripped.items():
+        if clean in iso3_by_name:
+            resolved[name] = iso3_by_name[clean]
+        else:
+            leftovers.append(name)
+
+    matches, scores = best_matches([stripped[n] for n in leftovers], country_list)
+    for name, match, score in zip(leftovers, matches, scores):
+        resolved[name] = iso3_by_name.get(match) if score >= threshold else None
+
+    report = pd.DataFrame({
+        "name": leftovers,
+        "match": matches,
+        "score": scores,
+        "ISO3": [resolved[n] for n in leftovers],
+    })
+
+    codes = pd.Series(
+        [None if pd.isna(n) else resolved[n] for n in names],
+        index=names.index,
+        dtype=object,
+    )
+    return codes, report
+
+
 def get_ISO3(name: str, country_list: list=country_list) -> str | None:
     """
     Get the ISO3 country code for a given country name.
-    Uses manual mappings and fuzzy matching for names not directly found.
+    Uses exact pycountry names first and fuzzy matching for names not directly found.
 
     @param name: Country name to look up.
     @return: ISO3 country code or None if not found.
@@ -398,18 +390,9 @@ def get_ISO3(name: str, country_list: list=country_list) -> str | None:
 
     if pd.isna(name):
         return None
-    
-    name = str(name).strip()
-    match, score = process.extractOne(name, country_list) 
 
-    if score < 88:  # safer high threshold
-        return None
-
-    country = pycountry.countries.get(name=match)
-    if country is None:
-        return None
-
-    return country.alpha_3
+    codes, _ = resolve_ISO3(pd.Series([name]), country_list)
+    return codes.iloc[0]
 
 
 def clean_country_names(df: pd.DataFrame) -> pd.DataFrame:
@@ -423,13 +406,10 @@ def clean_country_names(df: pd.DataFrame) -> pd.DataFrame:
     @return: Tuple of DataFrames, where first is the full merged dataframe, and second is the dataframe with countries with no data.
     """
     
-    df["Country"] = df["Country"].map(country_map).dropna()
+    df["Country"] = df["Country"].map(get_country_map()).dropna()
     df["Country"] = df["Country"].astype(str).str.strip()
 
-    df["Country"] = df["Country"].replace({
-    "Gaza Strip": "Palestine, State of",
-    "West Bank": "Palestine, State of"
-    })
+    df["Country"] = df["Country"].replace(MERGED_TERRITORIES)
     agg_rules = {}
 
     for col in df.columns:
@@ -454,36 +434,16 @@ def clean_country_names(df: pd.DataFrame) -> pd.DataFrame:
     missing_data = pd.DataFrame({"Country": missing_countries})
     df = pd.concat([df, missing_data], ignore_index=True)
 
-    df['ISO3'] = df['Country'].apply(get_ISO3)
+    df['ISO3'], fuzzy_report = resolve_ISO3(df['Country'])
+    logger.info(
+        "ISO3: %d names resolved, %d went through fuzzy matching",
+        df['Country'].nunique(), len(fuzzy_report),
+    )
+    for row in fuzzy_report.itertuples(index=False):
+        logger.info("ISO3 fuzzy match: %r -> %r (score %d, %s)", row.name, row.match, row.score, row.ISO3)
 
     return df
 
-def analyse_distribution(df: pd.DataFrame):
-
-    """
-    Analyse the distribution of values in each column of the DataFrame.
-    @param df: DataFrame to analyse.
-    @return: Dictionary with column names as keys and distribution info as values.
-    """
-
-    results = {}
-    for col in df.columns:
-        series = df[col]
-
-        if pd.api.types.is_numeric_dtype(series):
-            stats = series.describe().to_dict()
-            results[col] = {
-                "type": 'numeric',
-                "summary_stats": stats
-            }
-        else:
-            counts = series.value_counts(dropna=False).to_dict()
-            results[col] = {
-                "type": "categorical",
-                "value_counts": counts
-            }
-    return results
-
 def derive_new_metrics(df: pd.DataFrame) -> pd.DataFrame:
     """
     Deriving new metrics that are used.
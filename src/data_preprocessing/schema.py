@@ -0,0 +1,162 @@
+import warnings
+import numpy as np
+import pandas as pd
+
+# Declarative column schemas for the raw CIA csvs.
+# Each dataset lists every column it expects with the unit its values are written in.
+# unit None means the column is passed through untouched, na_values lists
+# column-specific placeholders that quietly become NaN.
+# apply_schema converts all columns sharing a unit in one vectorized pass.
+
+# strings that mean "no value" in the raw files (lowercase)
+NA_TOKENS = ["", "na", "n/a", "-", "none", "null", "negl", "negligible"]
+
+# how values of each unit are parsed:
+#   suffix      - appended to the column name after conversion
+#   lower       - lowercase before matching multipliers
+#   strip       - regex of characters removed before to_numeric
+#   multipliers - words that scale the value ('14.2 million sq km')
+UNITS = {
+    "%": {
+        "suffix": "_%",
+        "lower": False,
+        "strip": r"[%,]",
+        "multipliers": {},
+    },
+    "sq km": {
+        "suffix": "_sq_km",
+        "lower": True,
+        "strip": r"[^0-9\.\-]",
+        "multipliers": {"million": 1_000_000.0},
+    },
+    "km": {
+        "suffix": "_km",
+        "lower": True,
+        "strip": r"[^0-9\.\-]",
+        "multipliers": {"million": 1_000_000.0},
+    },
+    # plain numbers, possibly with thousands separators ('58,000')
+    "number": {
+        "suffix": "",
+        "lower": True,
+        "strip": r"[^0-9\.\-]",
+        "multipliers": {},
+    },
+}
+
+GEOGRAPHY_SCHEMA = {
+    "Country": {"unit": None},
+    "Geographic_Coordinates": {"unit": None},
+    "Area_Total": {"unit": "sq km", "dtype": "float64"},
+    "Land_Area": {"unit": "sq km", "dtype": "float64"},
+    "Water_Area": {"unit": "sq km", "dtype": "float64"},
+    "Land_Boundaries": {"unit": "km", "dtype": "float64"},
+    # one territory lists an island name instead of a length
+    "Coastline": {"unit": "km", "dtype": "float64", "na_values": ["Ile Amsterdam"]},
+    "Highest_Elevation": {"unit": None},
+    "Lowest_Elevation": {"unit": None},
+    "Forest_Land": {"unit": "%", "dtype": "float64"},
+    "Other_Land": {"unit": "%", "dtype": "float64"},
+    "Agricultural_Land": {"unit": "%", "dtype": "float64"},
+    "Arable_Land (%% of Total Agricultural Land)": {"unit": "%", "dtype": "float64"},
+    "Permanent_Crops (%% of Total Agricultural Land)": {"unit": "%", "dtype": "float64"},
+    "Permanent_Pasture (%% of Total Agricultural Land)": {"unit": "%", "dtype": "float64"},
+    "Irrigated_Land": {"unit": "sq km", "dtype": "float64"},
+}
+
+TRANSPORTATION_SCHEMA = {
+    "Country": {"unit": None},
+    "airports_paved_runways_count": {"unit": "number", "dtype": "Float64"},
+    "airports_unpaved_runways_count": {"unit": "number", "dtype": "Float64"},
+    "heliports_count": {"unit": "number", "dtype": "Float64"},
+    "roadways_km": {"unit": "number", "dtype": "Float64"},
+    "railways_km": {"unit": "number", "dtype": "Float64"},
+    "waterways_km": {"unit": "number", "dtype": "Float64"},
+    "gas_pipelines_km": {"unit": "number", "dtype": "Float64"},
+    "oil_pipelines_km": {"unit": "number", "dtype": "Float64"},
+    "refined_products_pipelines_km": {"unit": "number", "dtype": "Float64"},
+    "water_pipelines_km": {"unit": "number", "dtype": "Float64"},
+}
+
+
+def _parse_unit_block(values: pd.Series, unit: dict) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Parse a flat Series of raw values with one unit spec.
+
+    @return: Tuple of (float64 values, bool array of values that were present
+        but could not be parsed).
+    """
+    text = values.where(values.isna(), values.astype(str)).astype(object).str.strip()
+    if unit["lower"]:
+        text = text.str.lower()
+
+    factor = np.ones(len(text))
+    for word, multiplier in unit["multipliers"].items():
+        factor[text.str.contains(word, regex=False, na=False).to_numpy(dtype=bool)] = multiplier
+
+    cleaned = text.str.replace(unit["strip"], "", regex=True)
+    parsed = pd.to_numeric(cleaned, errors="coerce").to_numpy(dtype="float64") * factor
+
+    is_missing = text.isna() | text.str.lower().isin(NA_TOKENS)
+    failed = np.isnan(parsed) & ~is_missing.to_numpy(dtype=bool)
+    return parsed, failed
+
+
+def apply_schema(df: pd.DataFrame, schema: dict, dataset: str) -> pd.DataFrame:
+    """
+    Convert a raw dataset according to its schema.
+
+    Columns with a unit are parsed to numbers, cast to the schema dtype and
+    renamed with the unit suffix (converted columns are moved to the end, in
+    file order). All columns of the same unit are parsed together.
+
+    Raises ValueError if the file is missing a schema column. Columns that are
+    not in the schema and values that fail to parse only produce a warning,
+    unparsable values become NaN (NA_TOKENS and the column's na_values become
+    NaN without a warning).
+
+    @param df: Raw DataFrame as read from csv.
+    @param schema: Column schema, e.g. GEOGRAPHY_SCHEMA.
+    @param dataset: Dataset name used in messages.
+    @return: New DataFrame with converted columns.
+    """
+    missing = [col for col in schema if col not in df.columns]
+    if missing:
+        raise ValueError(f"{dataset}: columns missing from file: {missing}")
+
+    unexpected = [col for col in df.columns if col not in schema]
+    if unexpected:
+        warnings.warn(f"{dataset}: columns not in schema, left as is: {unexpected}")
+
+    to_convert = [col for col in df.columns if col in schema and schema[col]["unit"] is not None]
+
+    # group columns by unit and parse each group as one long column
+    by_unit = {}
+    for col in to_convert:
+        by_unit.setdefault(schema[col]["unit"], []).append(col)
+
+    parsed = {}
+    for unit_name, cols in by_unit.items():
+        flat = pd.Series(df[cols].to_numpy(dtype=object).ravel(order="F"))
+        values, failed = _parse_unit_block(flat, UNITS[unit_name])
+        values = values.reshape(len(df), len(cols), order="F")
+        failed = failed.reshape(len(df), len(cols), order="F")
+
+        for i, col in enumerate(cols):
+            parsed[col] = values[:, i]
+            known = schema[col].get("na_values")
+            if known:
+                raw = df[col].astype(str).str.strip().str.lower()
+                failed[:, i] &= ~raw.isin([v.lower() for v in known]).to_numpy()
+            if failed[:, i].any():
+                warnings.warn(
+                    f"{dataset}: {int(failed[:, i].sum())} value(s) in {col!r} "
+                    f"could not be parsed as {unit_name}, set to NaN"
+                )
+
+    out = df.drop(columns=to_convert)
+    for col in to_convert:
+        spec = schema[col]
+        new_name = f"{col}{UNITS[spec['unit']]['suffix']}"
+        out[new_name] = pd.Series(parsed[col], index=df.index).astype(spec["dtype"])
+    return out
@@ -0,0 +1,167 @@
+import bisect
+import os
+import threading
+import time
+from flask import Response, g, request
+
+# Per-callback metrics of the Dash app.
+# Every POST to the Dash callback route is timed on the Flask server (before and
+# after request hooks) and attributed to the callback that produces its output,
+# looked up in app.callback_map. Counters and histograms live in this module
+# behind a lock and are served as Prometheus text at /metrics; each callback
+# response also gets a Server-Timing header with its duration.
+# On by default, VISUALIZATION_METRICS=0 switches it off.
+
+METRICS_ENV = "VISUALIZATION_METRICS"
+CALLBACK_PATH = "/_dash-update-component"
+METRICS_PATH = "/metrics"
+# label of every request whose output isn't a registered callback
+UNKNOWN_CALLBACK = "unknown"
+
+# upper bounds, seconds and bytes (+Inf is implied)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_lock = threading.Lock()
+# callback name -> {"calls", "errors", "latency": [counts], "latency_sum", "bytes": [counts], "bytes_sum"}
+_metrics = {}
+
+
+def metrics_enabled() -> bool:
+    return os.environ.get(METRICS_ENV, "1").strip() != "0"
+
+
+def callback_name(app, output: str | None) -> str:
+    """
+    Name of the function behind a callback output id ("graph.figure",
+    "..a.children...b.style.." for several outputs).
+
+    @return: The function name, UNKNOWN_CALLBACK for outputs that aren't
+        registered (the id comes from the client, it never becomes a label).
+    """
+    entry = app.callback_map.get(output) if isinstance(output, str) else None
+    fn = entry.get("callback") if entry else None
+    return getattr(fn, "__name__", None) or UNKNOWN_CALLBACK
+
+
+def _bucket_counts(buckets: tuple) -> list:
+    # one count per bucket plus +Inf
+    return [0] * (len(buckets) + 1)
+
+
+def record(callback: str, seconds: float, size: int, error: bool = False):
+    """
+    Add one callback invocation to the metrics.
+
+    @param callback: Callback name.
+    @param seconds: Request duration.
+    @param size: Serialized response bytes.
+    @param error: The callback failed.
+    """
+    with _lock:
+        entry = _metrics.get(callback)
+        if entry is None:
+            entry = _metrics[callback] = {
+                "calls": 0,
+                "errors": 0,
+                "latency": _bucket_counts(LATENCY_BUCKETS),
+                "latency_sum": 0.0,
+                "bytes": _bucket_counts(BYTES_BUCKETS),
+                "bytes_sum": 0,
+            }
+        entry["calls"] += 1
+        entry["errors"] += bool(error)
+        entry["latency"][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        entry["latency_sum"] += seconds
+        entry["bytes"][bisect.bisect_left(BYTES_BUCKETS, size)] += 1
+        entry["bytes_sum"] += size
+
+
+def snapshot() -> dict:
+    """
+    Copy of the current metrics, callback name -> counters.
+    """
+    with _lock:
+        return {
+            name: {**entry, "latency": list(entry["latency"]), "bytes": list(entry["bytes"])}
+            for name, entry in _metrics.items()
+        }
+
+
+def reset():
+    with _lock:
+        _metrics.clear()
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _histogram_lines(metric: str, name: str, buckets: tuple, counts: list, total) -> list:
+    label = _label(name)
+    lines, cumulative = [], 0
+    for bound, count in zip(buckets + ("+Inf",), counts):
+        cumulative += count
+        lines.append(f'{metric}_bucket{{callback="{label}",le="{bound}"}} {cumulative}')
+    lines.append(f'{metric}_sum{{callback="{label}"}} {total}')
+    lines.append(f'{metric}_count{{callback="{label}"}} {cumulative}')
+    return lines
+
+
+def render_metrics() -> str:
+    """
+    The metrics in the Prometheus text exposition format (version 0.0.4).
+    """
+    metrics = snapshot()
+    lines = [
+        "# HELP dash_callback_calls_total Callback invocations.",
+        "# TYPE dash_callback_calls_total counter",
+        *(f'dash_callback_calls_total{{callback="{_label(n)}"}} {m["calls"]}' for n, m in metrics.items()),
+        "# HELP dash_callback_errors_total Callback invocations answered with an error status.",
+        "# TYPE dash_callback_errors_total counter",
+        *(f'dash_callback_errors_total{{callback="{_label(n)}"}} {m["errors"]}' for n, m in metrics.items()),
+        "# HELP dash_callback_duration_seconds Callback request duration.",
+        "# TYPE dash_callback_duration_seconds histogram",
+    ]
+    for name, m in metrics.items():
+        lines += _histogram_lines("dash_callback_duration_seconds", name, LATENCY_BUCKETS, m["latency"], m["latency_sum"])
+    lines += [
+        "# HELP dash_callback_response_bytes Serialized callback response size.",
+        "# TYPE dash_callback_response_bytes histogram",
+    ]
+    for name, m in metrics.items():
+        lines += _histogram_lines("dash_callback_response_bytes", name, BYTES_BUCKETS, m["bytes"], m["bytes_sum"])
+    return "\n".join(lines) + "\n"
+
+
+def init_callback_metrics(app):
+    """
+    Register the timing hooks and the /metrics route on app.server.
+    Does nothing when switched off by the env var.
+    """
+    if not metrics_enabled():
+        return
+    server = app.server
+    callback_path = app.config.requests_pathname_prefix.rstrip("/") + CALLBACK_PATH
+
+    @server.before_request
+    def start_callback_timer():
+        if request.method == "POST" and request.path == callback_path:
+            g.callback_start = time.perf_counter()
+
+    @server.after_request
+    def record_callback(response):
+        start = g.pop("callback_start", None)
+        if start is None:
+            return response
+        seconds = time.perf_counter() - start
+        body = request.get_json(silent=True) or {}
+        name = callback_name(app, body.get("output"))
+        size = response.calculate_content_length() or 0
+        record(name, seconds, size, error=response.status_code >= 400)
+        response.headers.add("Server-Timing", f'callback;desc="{_label(name)}";dur={seconds * 1000:.1f}')
+        return response
+
+    @server.route(METRICS_PATH)
+    def metrics_endpoint():
+        return Response(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,143 @@
+import cProfile
+import hashlib
+import hmac
+import json
+import logging
+import os
+import pathlib
+import threading
+import time
+from flask import g, request
+from src.utils.cache import CACHE_DIR
+from src.monitoring.callback_metrics import CALLBACK_PATH, callback_name
+
+# On-demand cProfile of single callback requests.
+# Off unless VISUALIZATION_PROFILE_TOKEN is set. A POST to the Dash callback
+# route that carries the same token (X-Profile-Token header or ?profile=<token>)
+# runs under cProfile; the stats are written to PROFILE_DIR as
+# "<ms>ms-<callback>-<inputs hash>.prof" (readable with pstats/snakeviz) next
+# to a .json with the callback, inputs and timing. Only the PROFILE_KEEP
+# slowest profiles are kept, the rest are deleted after every write.
+
+TOKEN_ENV = "VISUALIZATION_PROFILE_TOKEN"
+TOKEN_HEADER = "X-Profile-Token"
+TOKEN_ARG = "profile"
+
+PROFILE_DIR = pathlib.Path(os.environ.get("VISUALIZATION_PROFILE_DIR", CACHE_DIR / "profiles"))
+PROFILE_KEEP = int(os.environ.get("VISUALIZATION_PROFILE_KEEP", "20"))
+
+logger = logging.getLogger(__name__)
+
+# one writer at a time, so pruning doesn't race another write
+_write_lock = threading.Lock()
+
+
+def profile_token() -> str | None:
+    """
+    @return: The configured token, None when profiling is off.
+    """
+    return os.environ.get(TOKEN_ENV, "").strip() or None
+
+
+def _requested(token: str) -> bool:
+    given = request.headers.get(TOKEN_HEADER) or request.args.get(TOKEN_ARG) or ""
+    return hmac.compare_digest(given.encode(), token.encode())
+
+
+def _inputs_tag(body: dict) -> str:
+    # short stable hash of the inputs and state the callback ran with
+    inputs = json.dumps([body.get("inputs"), body.get("state")], sort_keys=True, default=str)
+    return hashlib.sha1(inputs.encode()).hexdigest()[:10]
+
+
+def _safe(name: str) -> str:
+    return "".join(ch if ch.isalnum() or ch in "_-" else "_" for ch in name)[:60]
+
+
+def _profile_duration(path: pathlib.Path) -> float:
+    # the file name starts with the duration in ms
+    try:
+        return float(path.name.split("ms-", 1)[0])
+    except ValueError:
+        return 0.0
+
+
+def prune_profiles(directory: pathlib.Path = PROFILE_DIR, keep: int = PROFILE_KEEP):
+    """
+    Delete all but the `keep` slowest profiles (and their .json) in directory.
+    """
+    profiles = sorted(directory.glob("*.prof"), key=_profile_duration, reverse=True)
+    for path in profiles[keep:]:
+        path.unlink(missing_ok=True)
+        path.with_suffix(".json").unlink(missing_ok=True)
+
+
+def save_profile(profiler: cProfile.Profile, callback: str, body: dict, seconds: float, status: int,
+                 directory: pathlib.Path = PROFILE_DIR, keep: int = PROFILE_KEEP) -> pathlib.Path | None:
+    """
+    Write a request profile and prune the directory to the slowest `keep`.
+
+    @param profiler: Stopped profiler of the request.
+    @param callback: Callback name.
+    @param body: Request JSON (output, inputs, state).
+    @param seconds: Request duration.
+    @param status: Response status code.
+    @return: Path of the .prof file, None if it was slower than none of the kept ones.
+    """
+    stem = f"{seconds * 1000:010.1f}ms-{_safe(callback)}-{_inputs_tag(body)}"
+    path = directory / f"{stem}.prof"
+    with _write_lock:
+        directory.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(path)
+        path.with_suffix(".json").write_text(json.dumps({
+            "callback": callback,
+            "output": body.get("output"),
+            "inputs": body.get("inputs"),
+            "state": body.get("state"),
+            "duration_s": seconds,
+            "status": status,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        }, default=str))
+        prune_profiles(directory, keep)
+    return path if path.exists() else None
+
+
+def init_request_profiler(app):
+    """
+    Register the profiling hooks on app.server. Does nothing without a token.
+    """
+    token = profile_token()
+    if token is None:
+        return
+    server = app.server
+    callback_path = app.config.requests_pathname_prefix.rstrip("/") + CALLBACK_PATH
+
+    @server.before_request
+    def start_request_profile():
+        if request.method != "POST" or request.path != callback_path or not _requested(token):
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # another profiler is already active in this thread
+            return
+        g.request_profile = (profiler, time.perf_counter())
+
+    @server.after_request
+    def save_request_profile(response):
+        started = g.pop("request_profile", None)
+        if started is None:
+            return response
+        profiler, start = started
+        profiler.disable()
+        seconds = time.perf_counter() - start
+        body = request.get_json(silent=True) or {}
+        try:
+            path = save_profile(profiler, callback_name(app, body.get("output")), body, seconds, response.status_code)
+        except OSError:
+            logger.exception("could not write request profile")
+            return response
+        if path is not None:
+            logger.info("request profile written to %s", path)
+        return response
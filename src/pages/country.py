@@ -4,10 +4,13 @@ import dash
 import dash_bootstrap_components as dbc
 from dash import dcc, html, callback, Input, Output
 
-from src.data_loading.load_data import load_data_into_df
+from src.data_loading.country_index import get_country_index, lookup_country
 
 dash.register_page(__name__, path="/country", name="Country", order=10)
 
+# build the ISO3 index at startup so the first click does not pay for it
+get_country_index()
+
 layout = dbc.Container(
     [
         dbc.Row(
@@ -46,13 +49,12 @@ def render_country_page(pathname, search):
     if not iso3:
         return dbc.Alert("No country selected. Return to the map.", color="warning")
 
-    df = load_data_into_df()
-    row = df[df["ISO3"] == iso3]
+    record = lookup_country(iso3)
 
-    if row.empty:
+    if record is None:
         return dbc.Alert(f"Unknown ISO3 code: {iso3}", color="danger")
 
-    country = row.iloc[0]["Country"]
+    country = record["Country"]
 
     return dbc.Card(
         dbc.CardBody(
@@ -4,11 +4,18 @@ import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 from dash import dcc, html, callback, Input, Output
-from src.data_loading.load_data import load_data_into_df
+from src.data_loading.store import get_dataset
+from src.components.figure_patch import trace_keys, figure_patch
+from src.analytics.regression import get_fit, precompute_fits
+from src.analytics.anomalies import get_residual_tensor
+from src.analytics.correlation import correlation_subset, cluster_order
+from src.analytics.ranking import get_rank_index, top_from_index, partial_ranking
+from src.analytics.filters import resolve_filters
+from src.analytics.stats import column_range
 
 dash.register_page(__name__, path="/global", name="Global", order=1)
 
-DF = load_data_into_df()
+DF = get_dataset()
 
 def _numeric_cols(df: pd.DataFrame) -> list[str]:
     return [c for c in df.columns if c != "Country" and pd.api.types.is_numeric_dtype(df[c])]
@@ -90,49 +97,63 @@ DEFAULT_X = "Real_GDP_per_Capita_USD"
 DEFAULT_Y = "Life_Expectancy_at_Birth_(years)"
 DEFAULT_LEADERBOARD_METRIC = "Real_GDP_per_Capita_USD"
 
+# fits are cheap moment sums, do every dropdown combination up front
+precompute_fits(ECON_COLS, SOCIAL_COLS)
+# residuals of every pair at once, for over/under-performer queries
+get_residual_tensor(ECON_COLS, SOCIAL_COLS, LOWER_IS_BETTER)
+# full rankings for the fixed leaderboard metrics
+for metric in LEADERBOARD_METRICS:
+    get_rank_index(metric, metric in LOWER_IS_BETTER_LEADERBOARD)
+
 def build_scatter(
-    df: pd.DataFrame,
     x_col: str,
     y_col: str,
     use_log_x: bool,
     show_reg_line: bool,
     top_n: int,
+    mask: np.ndarray | None = None,
 ) -> go.Figure:
-    d = df[["Country", x_col, y_col]].copy()
-    d = d.dropna(subset=[x_col, y_col])
-
-    if use_log_x:
-        d = d[d[x_col] > 0].copy()
-        x_for_model = np.log(d[x_col].astype(float).values)
-        x_label = f"log({x_col})"
-    else:
-        x_for_model = d[x_col].astype(float).values
-        x_label = x_col
-
-    y = d[y_col].astype(float).values
-
-    b, a = np.polyfit(x_for_model, y, 1)
-    y_hat = a + b * x_for_model
-    resid = y - y_hat
+    # the fit (and residual order) is cached per column pair, this only slices it.
+    # the active filter (mask over dataset rows) only changes which countries
+    # are shown, the expected line is always fitted on every country
+    fit = get_fit(x_col, y_col, use_log_x)
+    x_label = f"log({x_col})" if use_log_x else x_col
+
+    a, b = fit["intercept"], fit["slope"]
+    resid = fit["residual"]
+    order = fit["order"]
     if y_col in LOWER_IS_BETTER:
         resid = -resid
-    d["predicted"] = y_hat
-    d["residual"] = resid
-
-    d_sorted = d.sort_values("residual")
-    under = d_sorted.head(top_n)
-    over = d_sorted.tail(top_n)
+        order = order[::-1]
+
+    rows = fit["rows"]
+    d = pd.DataFrame({
+        "Country": DF["Country"].to_numpy()[rows],
+        x_col: DF[x_col].to_numpy()[rows],
+        y_col: DF[y_col].to_numpy()[rows],
+        "predicted": fit["predicted"],
+        "residual": resid,
+    })
+
+    shown = d
+    if mask is not None:
+        keep = mask[rows]
+        shown = d[keep]
+        order = order[keep[order]]
+
+    under = d.iloc[order[:top_n]]
+    over = d.iloc[order[max(len(order) - top_n, 0):]]
 
     fig = go.Figure()
 
     fig.add_trace(
         go.Scatter(
-            x=d[x_col] if not use_log_x else d[x_col],
-            y=d[y_col],
+            x=shown[x_col] if not use_log_x else shown[x_col],
+            y=shown[y_col],
             mode="markers",
             name="Countries",
             marker=dict(size=7, opacity=0.45),
-            customdata=np.stack([d["Country"], d["predicted"], d["residual"]], axis=1),
+            customdata=np.stack([shown["Country"], shown["predicted"], shown["residual"]], axis=1),
             hovertemplate=(
                 "<b>%{customdata[0]}</b><br>"
                 f"{x_col}: %{{x}}<br>"
@@ -219,21 +240,26 @@ def build_scatter(
 
     return fig
 
-def build_correlation_heatmap(df: pd.DataFrame, cols: list[str]) -> go.Figure:
-    data = df[cols].dropna()
-    corr = data.corr()
+def build_correlation_heatmap(cols: list[str], method: str = "pearson", cluster: bool = False) -> go.Figure:
+    # pairwise-complete matrices are precomputed for every numeric column,
+    # each cell uses all countries that have both values
+    if cluster:
+        cols = cluster_order(cols, method)
+    corr, counts = correlation_subset(cols, method)
 
     fig = go.Figure(
         data=go.Heatmap(
             z=corr.values,
             x=corr.columns,
             y=corr.columns,
+            customdata=counts.values,
             colorscale="RdBu",
             zmid=0,
             colorbar=dict(title="Correlation"),
             hovertemplate=(
                 "<b>%{x}</b> vs <b>%{y}</b><br>"
-                "Correlation: %{z:.2f}<extra></extra>"
+                "Correlation: %{z:.2f}<br>"
+                "Countries: %{customdata}<extra></extra>"
             ),
         )
     )
@@ -254,61 +280,78 @@ def build_correlation_heatmap(df: pd.DataFrame, cols: list[str]) -> go.Figure:
 
     return fig
 
-def build_global_ranking(df: pd.DataFrame, metric: str, top_n: int = 50, show_bottom: bool = False) -> go.Figure:
-    data = df[["Country", metric]].copy().dropna()
+def build_global_ranking(metric: str, top_n: int = 50, show_bottom: bool = False, mask: np.ndarray | None = None) -> go.Figure:
+    lower_is_better = metric in LOWER_IS_BETTER_LEADERBOARD
+    if metric in LEADERBOARD_METRICS:
+        # precomputed full ranking, top/bottom N is a slice
+        ranked = get_rank_index(metric, lower_is_better)
+        picked = top_from_index(ranked, top_n, show_bottom, mask)
+    else:
+        ranked = partial_ranking(DF, metric, top_n, lower_is_better, show_bottom, mask, column_range(metric))
+        picked = ranked["order"]
     
-    if data.empty:
-        fig = go.Figure()
-        fig.add_annotation(text="No data available for selected metric", showarrow=False)
+    fig = go.Figure()
+    # always one bar trace and the same layout keys, so update_global_ranking
+    # can patch between any two states (including "no data")
+    fig.update_layout(
+        height=600, 
+        xaxis_title="Normalized Score (0-100)",
+        margin=dict(l=250, r=20, t=60, b=20),
+        font=dict(size=12),
+        yaxis_categoryorder='array', 
+    )
+
+    if len(picked) == 0:
+        if len(ranked["rows"]) == 0:
+            message = "No data available for selected metric"
+        else:
+            message = "No countries match the active filters"
+        fig.add_trace(go.Bar(x=[], y=[], orientation='h'))
+        fig.update_layout(
+            title=None,
+            yaxis_categoryarray=[],
+            annotations=[dict(text=message, showarrow=False)],
+        )
         return fig
     
-    values = data[metric].astype(float)
-    if metric in LOWER_IS_BETTER_LEADERBOARD:
-        values = -values
-    
-    data['Score'] = values
-    
-    min_val, max_val = data['Score'].min(), data['Score'].max()
-    if max_val > min_val:
-        data['Score'] = (data['Score'] - min_val) / (max_val - min_val) * 100
-    
     if show_bottom:
-        ranking = data.sort_values('Score', ascending=True).reset_index(drop=True)  # Lowest first
         title_suffix = f" BOTTOM {top_n}"
         color_scale = 'Reds'  # Red for "bad" performance
     else:
-        ranking = data.sort_values('Score', ascending=False).reset_index(drop=True)  # Highest first
         title_suffix = f" TOP {top_n}"
         color_scale = 'Viridis'  # Green for "good" performance
+
+    rows = ranked["rows"][picked]
+    countries = DF["Country"].to_numpy()[rows]
+    scores = ranked["score"][picked]
     
-    fig = go.Figure()
     fig.add_trace(go.Bar(
-        y=ranking['Country'][:top_n],
-        x=ranking['Score'][:top_n],
+        y=countries,
+        x=scores,
         orientation='h',
         marker=dict(
-            color=ranking['Score'][:top_n], 
+            color=scores, 
             colorscale=color_scale, 
             colorbar=dict(title="Score (0-100)")
         ), 
-        text=ranking['Score'][:top_n].round(1),
+        text=scores.round(1),
         textposition='auto',
         hovertemplate='<b>%{y}</b><br>Score: %{x:.1f}<br>Raw: %{customdata:.2f}<extra></extra>',
-        customdata=ranking[metric][:top_n].round(2)
+        customdata=DF[metric].to_numpy()[rows].round(2)
     ))
     
     fig.update_layout(
         title=f"🏆 {metric.replace('_', ' ').title()}{title_suffix} Countries",
-        yaxis_categoryorder='array', 
-        yaxis_categoryarray=ranking['Country'][:top_n].tolist(),
-        height=600, 
-        xaxis_title="Normalized Score (0-100)",
-        margin=dict(l=250, r=20, t=60, b=20),
-        font=dict(size=12)
+        yaxis_categoryarray=countries.tolist(),
+        annotations=[],
     )
     
     return fig
 
+# keys that change between leaderboard states, everything else is sent once with the page
+RANKING_TRACE_KEYS = trace_keys(build_global_ranking(DEFAULT_LEADERBOARD_METRIC, 50))
+RANKING_LAYOUT_KEYS = ["title", "yaxis.categoryarray", "annotations"]
+
 layout = dbc.Container(
     [
         html.H1("Global analysis", className="mb-3"),
@@ -400,7 +443,7 @@ layout = dbc.Container(
                             dbc.CardBody(
                                 dcc.Graph(
                                     id="global-corr-heatmap",
-                                    figure=build_correlation_heatmap(DF, CORR_COLS),
+                                    figure=build_correlation_heatmap(CORR_COLS),
                                     style={"height": "520px"},
                                 ),
                             ),
@@ -452,7 +495,7 @@ layout = dbc.Container(
                                 
                                 dcc.Graph(
                                     id="global-ranking",
-                                    figure=build_global_ranking(DF, DEFAULT_LEADERBOARD_METRIC, 50),
+                                    figure=build_global_ranking(DEFAULT_LEADERBOARD_METRIC, 50),
                                     style={"height": "600px"},
                                     config={"displayModeBar": True},
                                 ),
@@ -476,17 +519,22 @@ layout = dbc.Container(
     Input("global-y-col", "value"),
     Input("global-options", "value"),
     Input("global-top-n", "value"),
+    Input("filters-store", "data"),
 )
-def update_global_scatter(x_col: str, y_col: str, options: list[str], top_n: int):
+def update_global_scatter(x_col: str, y_col: str, options: list[str], top_n: int, filters: dict):
     use_log_x = "logx" in (options or [])
     show_reg = "reg" in (options or [])
-    return build_scatter(DF, x_col, y_col, use_log_x, show_reg, int(top_n))
+    _, mask = resolve_filters(filters)
+    return build_scatter(x_col, y_col, use_log_x, show_reg, int(top_n), mask)
 
 @callback(
     Output("global-ranking", "figure"),
     Input("leaderboard-metric", "value"),
     Input("ranking-top-n", "value"),
-    Input("show-bottom", "value")
+    Input("show-bottom", "value"),
+    Input("filters-store", "data"),
 )
-def update_global_ranking(metric: str, top_n: int, show_bottom: list):
-    return build_global_ranking(DF, metric, top_n, "bottom" in show_bottom)
+def update_global_ranking(metric: str, top_n: int, show_bottom: list, filters: dict):
+    _, mask = resolve_filters(filters)
+    fig = build_global_ranking(metric, top_n, "bottom" in show_bottom, mask)
+    return figure_patch(fig, RANKING_TRACE_KEYS, RANKING_LAYOUT_KEYS)
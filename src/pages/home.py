@@ -1,23 +1,71 @@
-import pandas as pd
+import base64
+import functools
+import json
+import os
+import numpy as np
 import plotly.express as px
 import dash
 import dash_bootstrap_components as dbc
-from dash import html, dcc, callback, Input, Output
+from dash import html, dcc, callback, clientside_callback, ClientsideFunction, Input, Output, State
 import urllib.parse
 
-from src.components.map import generate_choropleth, make_base_map
-from src.components.tabs import tab_layout
-from src.data_loading.load_data import load_data_into_df
+from src.components.map import generate_choropleth, make_base_map, get_empty_mask
+from src.components.figure_patch import trace_keys, figure_patch
+from src.components.tabs import tab_layout, VIEW_METRICS
+from src.data_loading.store import get_dataset, get_dataset_version
+from src.analytics.filters import resolve_filters, mask_for_key
 
 dash.register_page(__name__, path="/", name="Home", order=0)
 
-df = load_data_into_df()
-cols_to_ignore = ["Country", "ISO3"]
-mask_empty = df.drop(columns=cols_to_ignore).isna().all(axis=1)
-df_empty = df[mask_empty]
-df_nonempty = df[~mask_empty]
+# when on, every view metric is sent to the browser once and metric switches
+# are handled by a clientside callback (assets/map_clientside.js) instead of
+# a server round trip per click
+CLIENTSIDE_METRIC_SWITCH = os.environ.get("VISUALIZATION_CLIENTSIDE_MAP", "0") == "1"
+
+df = get_dataset()
+mask_empty = get_empty_mask()
 
 fig_map = generate_choropleth()
+fig_map_json = json.loads(fig_map.to_json())
+
+
+def _metric_title(column: str) -> str:
+    return f"{column.replace('_', ' ').title()} by Country"
+
+
+def _encode_array(values: np.ndarray, dtype: str) -> dict:
+    """
+    Typed array as {"dtype", "bdata"} with the raw little endian bytes in base64.
+    """
+    data = np.ascontiguousarray(values, dtype=np.dtype(dtype).newbyteorder("<"))
+    return {"dtype": dtype, "bdata": base64.b64encode(data.tobytes()).decode("ascii")}
+
+
+@functools.lru_cache(maxsize=1)
+def map_payload(dataset_version: str) -> dict:
+    """
+    Everything the clientside callback needs to draw any view metric:
+    ISO3 codes and country names once, one float32 array per metric (NaN for
+    missing) and the static parts of the figure.
+    Cached per dataset version, the payload is the same for every visitor.
+    """
+    metrics = [m for m in VIEW_METRICS if m in df.columns]
+    base_layout = json.loads(make_base_map().to_json())["layout"]
+
+    return {
+        "iso3": df["ISO3"].astype(object).where(df["ISO3"].notna(), None).tolist(),
+        "country": df["Country"].astype(str).tolist(),
+        "has_data": _encode_array(~mask_empty.to_numpy(), "uint8"),
+        "metrics": {
+            m: _encode_array(df[m].to_numpy(dtype="float64", na_value=np.nan), "float32")
+            for m in metrics
+        },
+        "titles": {m: _metric_title(m) for m in metrics},
+        "colorscale": px.colors.sequential.Plasma,
+        "layout": base_layout,
+        "initial_figure": fig_map_json,
+    }
+
 
 layout = dbc.Container(
     dbc.Row([
@@ -25,39 +73,91 @@ layout = dbc.Container(
                 width=12, className="mb-4"),
 
         dbc.Col(tab_layout(), width=12, className="mt-4"),
+        *([dcc.Store(id="map-payload", data=map_payload(get_dataset_version()))]
+          if CLIENTSIDE_METRIC_SWITCH else []),
     ]),
     fluid=True
 )
 
-@callback(Output("graph", "figure"), Input("views-radioitems", "value"))
-def update_graph(selected_column):
-    if selected_column is None or selected_column not in df.columns:
-        return fig_map
+@functools.lru_cache(maxsize=128)
+def metric_figure(selected_column: str, dataset_version: str, filter_key: str | None = None) -> dict:
+    """
+    Choropleth for one metric, already serialized to a plain json dict.
+    Countries removed by the active filter are drawn like countries without data.
+    Cached per (metric, dataset version, filter) so switching metrics is a dict lookup.
+    """
+    has_value = ~mask_empty.to_numpy() & df[selected_column].notna().to_numpy()
+    shown = has_value
+    mask = mask_for_key(filter_key)
+    if mask is not None:
+        shown = has_value & mask
+
+    df_shown = df[shown]
+    df_hidden = df[~shown]
 
     fig = make_base_map()
     fig.add_choropleth(
-        locations=df_nonempty["ISO3"],
-        z=df_nonempty[selected_column],
+        locations=df_shown["ISO3"],
+        z=df_shown[selected_column],
         colorscale=px.colors.sequential.Plasma,
-        hovertext=df_nonempty["Country"],
+        hovertext=df_shown["Country"],
         hoverinfo="text+z",
     )
 
-    mask_empty_col = df_nonempty[selected_column].isna()
-    df_empty_col = pd.concat([df_empty, df_nonempty[mask_empty_col]], ignore_index=True)
+    if mask is None:
+        hidden_text = "No data available"
+    else:
+        hidden_text = np.where(has_value[~shown], "Filtered out", "No data available")
 
     fig.add_choropleth(
-        locations=df_empty_col["ISO3"],
-        z=[0] * len(df_empty_col),
+        locations=df_hidden["ISO3"],
+        z=[0] * len(df_hidden),
         showscale=False,
-        hovertext="No data available",
+        hovertext=hidden_text,
         hoverinfo="text",
         marker_line_width=0.8,
         colorscale=[[0, "rgba(0,0,0,0)"], [1, "rgba(0,0,0,0)"]],
     )
 
-    fig.update_layout(title=f"{selected_column.replace('_', ' ').title()} by Country")
-    return fig
+    fig.update_layout(title=_metric_title(selected_column))
+    return json.loads(fig.to_json())
+
+
+def update_graph(selected_column, filters):
+    """
+    Switch the map to selected_column (and the active filter). Only traces and
+    title are sent, the geo layout and template stay as they are in the browser.
+    """
+    key, _ = resolve_filters(filters)
+    if selected_column is None or selected_column not in df.columns:
+        figure = json.loads(generate_choropleth(key).to_json()) if key else fig_map_json
+    else:
+        figure = metric_figure(selected_column, get_dataset_version(), key)
+
+    return figure_patch(figure, MAP_TRACE_KEYS, ["title"])
+
+
+if CLIENTSIDE_METRIC_SWITCH:
+    clientside_callback(
+        ClientsideFunction(namespace="map", function_name="switch_metric"),
+        Output("graph", "figure"),
+        Input("views-radioitems", "value"),
+        Input("filters-store", "data"),
+        State("map-payload", "data"),
+    )
+else:
+    # warm the cache for every metric offered in the Views tab
+    metric_figures = [metric_figure(m, get_dataset_version()) for m in VIEW_METRICS if m in df.columns]
+
+    # the outline map and every metric map share the same two traces,
+    # patches overwrite any key either of them uses
+    MAP_TRACE_KEYS = trace_keys(fig_map_json, *metric_figures)
+
+    callback(
+        Output("graph", "figure"),
+        Input("views-radioitems", "value"),
+        Input("filters-store", "data"),
+    )(update_graph)
 
 
 @callback(
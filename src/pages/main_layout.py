@@ -1,6 +1,7 @@
 import dash
 import dash_bootstrap_components as dbc
 from dash import dcc
+from src.components.tabs import DEFAULT_FILTERS
 
 
 def Navbar():
@@ -21,6 +22,8 @@ def get_layout():
     return dbc.Container(
         [
             dcc.Location(id="url", refresh="callback-nav"),
+            # active filters, shared by every page (see components/tabs.py)
+            dcc.Store(id="filters-store", storage_type="memory", data=DEFAULT_FILTERS),
             Navbar(),
             dash.page_container,
         ],
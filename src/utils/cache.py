@@ -0,0 +1,21 @@
+import hashlib
+import os
+import pathlib
+
+# Shared location of the on-disk caches (dataset snapshot, country alias map)
+# and the file hashing their cache keys are built from. Kept outside
+# data_loading and data_preprocessing so both can use it.
+
+PROJECT_ROOT = pathlib.Path(__file__).parent.parent.parent
+CACHE_DIR = pathlib.Path(os.environ.get("VISUALIZATION_CACHE_DIR", PROJECT_ROOT / ".cache"))
+
+
+def file_digest(path: pathlib.Path) -> str:
+    """
+    sha256 of a file's contents.
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
@@ -0,0 +1,123 @@
+import json
+import logging
+import os
+import pathlib
+import time
+import tracemalloc
+import pandas as pd
+
+# Stage-level timing of the load pipeline.
+# Off unless VISUALIZATION_PIPELINE_PROFILE is set: "1" logs one INFO record
+# with the JSON report, any other value is a file path the report is written
+# to (and logged). When off, load_data_into_df gets no report and run_stage
+# is a plain function call.
+
+PROFILE_ENV = "VISUALIZATION_PIPELINE_PROFILE"
+
+logger = logging.getLogger(__name__)
+
+
+def profile_target() -> str | None:
+    """
+    @return: Value of the profiling env var, None when profiling is off.
+    """
+    value = os.environ.get(PROFILE_ENV, "").strip()
+    return None if value in ("", "0") else value
+
+
+def new_report(trace_memory: bool = True) -> dict:
+    """
+    Empty report for run_stage to fill.
+
+    @param trace_memory: Record the peak allocation of every stage with
+        tracemalloc (started here if it isn't running, stopped again by
+        finish_report). Slows the stages down a bit.
+    """
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    return {
+        "stages": [],
+        "trace_memory": trace_memory,
+        "_started_tracing": started_tracing,
+        "_start": (time.perf_counter(), time.process_time()),
+    }
+
+
+def report_from_env() -> dict | None:
+    """
+    new_report() if profiling is switched on by the env var, else None.
+    """
+    return new_report() if profile_target() is not None else None
+
+
+def _shape(result) -> tuple[int | None, int | None]:
+    if isinstance(result, tuple):
+        result = result[0]
+    if isinstance(result, pd.DataFrame):
+        return result.shape
+    if isinstance(result, dict):
+        # dict of frames (csvs by name): total rows
+        frames = [v for v in result.values() if isinstance(v, pd.DataFrame)]
+        return sum(len(f) for f in frames), None
+    return None, None
+
+
+def run_stage(report: dict | None, name: str, fn, *args, **kwargs):
+    """
+    Call fn(*args, **kwargs), recording wall time, CPU time, peak allocation
+    and the output shape under `name` when report is not None.
+
+    @return: Whatever fn returns.
+    """
+    if report is None:
+        return fn(*args, **kwargs)
+
+    tracing = report["trace_memory"] and tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+    wall, cpu = time.perf_counter(), time.process_time()
+    result = fn(*args, **kwargs)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+    rows, cols = _shape(result)
+    report["stages"].append({
+        "stage": name,
+        "wall_s": wall,
+        "cpu_s": cpu,
+        "peak_mib": (tracemalloc.get_traced_memory()[1] - before) / 2**20 if tracing else None,
+        "rows": rows,
+        "cols": cols,
+    })
+    return result
+
+
+def finish_report(report: dict | None, **extra) -> dict | None:
+    """
+    Close a report: add totals and `extra` fields, stop tracemalloc if
+    new_report started it, then log it and write it to the env var path.
+
+    @return: The finished report (private fields removed), None if report is None.
+    """
+    if report is None:
+        return None
+    start_wall, start_cpu = report.pop("_start")
+    if report.pop("_started_tracing"):
+        tracemalloc.stop()
+
+    peaks = [s["peak_mib"] for s in report["stages"] if s["peak_mib"] is not None]
+    report.update({
+        "total_wall_s": time.perf_counter() - start_wall,
+        "total_cpu_s": time.process_time() - start_cpu,
+        "max_stage_peak_mib": max(peaks) if peaks else None,
+        **extra,
+    })
+
+    target = profile_target()
+    if target is not None:
+        text = json.dumps(report)
+        logger.info("pipeline profile %s", text)
+        if target != "1":
+            pathlib.Path(target).write_text(text)
+    return report